@@ -1,45 +1,57 @@
 import { WORLD_LOCATIONS, } from "./types.js";
 import { initializeChoropleths } from "./choropleth.js";
 import { initializeLineGraph } from "./line_charts.js";
+function decodeLocationCovidData(wireData, dates) {
+    const nDates = wireData.date.length;
+    const dodd = {
+        cases: [],
+        cases_per_capita: [],
+        deaths: [],
+        deaths_per_capita: [],
+    };
+    for (let [caseType, data] of Object.entries(dodd)) {
+        for (let i = 0; i < nDates; ++i) {
+            const diff = wireData.net[caseType][i] - wireData.net[caseType][i - 1];
+            if (isNaN(diff)) {
+                data.push(0);
+            }
+            else {
+                data.push(diff);
+            }
+        }
+    }
+    return {
+        date: Object.fromEntries(wireData.date.map((code, i) => [dates[code], i])),
+        outbreak_cutoffs: wireData.outbreak_cutoffs,
+        net: wireData.net,
+        dodd,
+    };
+}
+function decodeScopedCovidData(wireData) {
+    const data = {};
+    for (const [code, locationData] of Object.entries(wireData.data)) {
+        data[code] = decodeLocationCovidData(locationData, wireData.dates);
+    }
+    return { agg: wireData.agg, data };
+}
 function assignData(allCovidData, allGeoData) {
     WORLD_LOCATIONS.forEach(location => {
-        const scopedGeoData = allGeoData[location];
-        scopedGeoData.features.forEach(feature => {
-            const covidData = allCovidData[location].data[feature.properties.code];
-            feature.covidData = covidData;
-            if (covidData === undefined) {
-                return;
-            }
-            const nDates = Object.keys(covidData.date).length;
-            feature.covidData.dodd = (() => {
-                const dodd = {
-                    cases: [],
-                    cases_per_capita: [],
-                    deaths: [],
-                    deaths_per_capita: [],
-                };
-                for (let [caseType, data] of Object.entries(dodd)) {
-                    for (let i = 0; i < nDates; ++i) {
-                        const diff = covidData.net[caseType][i] - covidData.net[caseType][i - 1];
-                        if (isNaN(diff)) {
-                            data.push(0);
-                        }
-                        else {
-                            data.push(diff);
-                        }
-                    }
-                }
-                return dodd;
-            })();
+        allGeoData[location].features.forEach(feature => {
+            feature.covidData = allCovidData[location].data[feature.properties.code];
         });
     });
 }
 Promise.all([
-    d3.json("./data/covid_data-292c76bf37ef9cff2eea04c03741dc94560a5c39.json"),
+    d3.json("./data/covid_data-usa-5f6416065097acacfe6722ef97941168159cdb85.json"),
+    d3.json("./data/covid_data-world-4488ba1777386a344a27e710d6748d33c66df0d7.json"),
     d3.json("./data/geo_data-be6715bfac29cf1d59f8c05b805ce8db5b42283f.json"),
 ]).then(objects => {
-    const allCovidData = objects[0];
-    const allGeoData = objects[1];
+    const allCovidDataWire = { usa: objects[0], world: objects[1] };
+    const allCovidData = {
+        usa: decodeScopedCovidData(allCovidDataWire.usa),
+        world: decodeScopedCovidData(allCovidDataWire.world),
+    };
+    const allGeoData = objects[2];
     d3.selectAll(".initial-plot-area").style("min-height", null);
     assignData(allCovidData, allGeoData);
     initializeChoropleths(allCovidData, allGeoData);
@@ -2,65 +2,81 @@ declare const d3: any;
 
 import {
 	AllCovidData,
+	AllCovidDataWire,
 	AllGeoData,
 	CaseType,
+	DateString,
 	LocationCovidData,
-	ScopedGeoData,
+	LocationCovidDataWire,
+	ScopedCovidData,
+	ScopedCovidDataWire,
 	WORLD_LOCATIONS,
 } from "./types.js";
 
 import { initializeChoropleths } from "./choropleth.js";
 import { initializeLineGraph } from "./line_charts.js";
 
-function assignData(allCovidData: AllCovidData, allGeoData: AllGeoData) {
-	WORLD_LOCATIONS.forEach(location => {
-		const scopedGeoData: ScopedGeoData = allGeoData[location];
-		scopedGeoData.features.forEach(feature => {
-			const covidData: LocationCovidData =
-				allCovidData[location].data[feature.properties.code];
-			feature.covidData = covidData;
+function decodeLocationCovidData(
+	wireData: LocationCovidDataWire,
+	dates: DateString[],
+): LocationCovidData {
+	const nDates = wireData.date.length;
+	const dodd: { [key in CaseType]: number[] } = {
+		cases: [],
+		cases_per_capita: [],
+		deaths: [],
+		deaths_per_capita: [],
+	};
 
-			if (covidData === undefined) {
-				return;
+	for (let [caseType, data] of Object.entries(dodd) as [CaseType, number[]][]) {
+		for (let i = 0; i < nDates; ++i) {
+			const diff = wireData.net[caseType][i] - wireData.net[caseType][i - 1];
+			if (isNaN(diff)) {
+				data.push(0);
+			} else {
+				data.push(diff);
 			}
+		}
+	}
 
-			const nDates = Object.keys(covidData.date).length;
-			feature.covidData.dodd = (() => {
-				const dodd: { [key in CaseType]: number[] } = {
-					cases: [],
-					cases_per_capita: [],
-					deaths: [],
-					deaths_per_capita: [],
-				};
+	return {
+		// Dates are sent as codes into the scope's dates; map them back
+		date: Object.fromEntries(wireData.date.map((code, i) => [dates[code], i])),
+		outbreak_cutoffs: wireData.outbreak_cutoffs,
+		net: wireData.net,
+		dodd,
+	};
+}
 
-				for (let [caseType, data] of Object.entries(dodd) as [
-					CaseType,
-					number[],
-				][]) {
-					for (let i = 0; i < nDates; ++i) {
-						const diff =
-							covidData.net[caseType][i] - covidData.net[caseType][i - 1];
-						if (isNaN(diff)) {
-							data.push(0);
-						} else {
-							data.push(diff);
-						}
-					}
-				}
+function decodeScopedCovidData(wireData: ScopedCovidDataWire): ScopedCovidData {
+	const data: { [key: string]: LocationCovidData } = {};
+	for (const [code, locationData] of Object.entries(wireData.data)) {
+		data[code] = decodeLocationCovidData(locationData, wireData.dates);
+	}
 
-				return dodd;
-			})();
+	return { agg: wireData.agg, data };
+}
+
+function assignData(allCovidData: AllCovidData, allGeoData: AllGeoData) {
+	WORLD_LOCATIONS.forEach(location => {
+		allGeoData[location].features.forEach(feature => {
+			feature.covidData = allCovidData[location].data[feature.properties.code];
 		});
 	});
 }
 
 // Use the custom digest of the data file to only pull from the web anew, ignoring browser cache, when data has actually updated
 Promise.all([
-	d3.json("./data/covid_data-292c76bf37ef9cff2eea04c03741dc94560a5c39.json"),
+	d3.json("./data/covid_data-usa-5f6416065097acacfe6722ef97941168159cdb85.json"),
+	d3.json("./data/covid_data-world-4488ba1777386a344a27e710d6748d33c66df0d7.json"),
 	d3.json("./data/geo_data-be6715bfac29cf1d59f8c05b805ce8db5b42283f.json"),
 ]).then(objects => {
-	const allCovidData: AllCovidData = objects[0];
-	const allGeoData: AllGeoData = objects[1];
+	const allCovidDataWire: AllCovidDataWire = { usa: objects[0], world: objects[1] };
+	const allCovidData: AllCovidData = {
+		usa: decodeScopedCovidData(allCovidDataWire.usa),
+		world: decodeScopedCovidData(allCovidDataWire.world),
+	};
+	const allGeoData: AllGeoData = objects[2];
 
 	d3.selectAll(".initial-plot-area").style("min-height", null);
 	// const startMS = new Date().getTime();
@@ -90,4 +90,25 @@ export interface LocationCovidData {
 	dodd: DataGroup;
 }
 
+// The covid data as it's fetched, before plots.ts decodes it into the types above
+export interface AllCovidDataWire {
+	usa: ScopedCovidDataWire;
+	world: ScopedCovidDataWire;
+}
+
+export interface ScopedCovidDataWire {
+	agg: ScopedCovidData["agg"];
+	// Locations' dates arrive as codes into this array
+	dates: DateString[];
+	data: {
+		[key: string]: LocationCovidDataWire;
+	};
+}
+
+export interface LocationCovidDataWire {
+	date: number[];
+	outbreak_cutoffs: OutbreakCutoffs;
+	net: DataGroup;
+}
+
 export type TooltipVisibility = "visible" | "hidden" | "nochange";
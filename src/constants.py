@@ -357,6 +357,7 @@ class CaseInfo:
     _DASH_STYLES: Mapping[DiseaseStage, Tuple]
 
     @classmethod
+    @lru_cache(None)
     def get_info_item_for(
         cls, field: InfoField, *, stage: DiseaseStage, count: Counting
     ) -> Atom:
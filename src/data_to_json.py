@@ -1,16 +1,34 @@
 # %%
+import functools
 import hashlib
-import json
+import os
 import re
+import tempfile
 from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
 
 import geopandas
+import numpy as np
+import orjson
 import pandas as pd
 from IPython.display import display  # noqa E401
 
 from constants import CaseTypes, Columns, Locations, Paths
 
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.feather
+except ImportError:
+    pyarrow = None
+
 GEO_DATA_DIR = Paths.DATA / "Geo"
+COUNTRIES_SHAPEFILE = (
+    GEO_DATA_DIR / "ne_110m_admin_0_map_units" / "ne_110m_admin_0_map_units.shp"
+)
+USA_STATES_SHAPEFILE = (
+    GEO_DATA_DIR / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
+)
 CODE = "code"
 
 
@@ -24,7 +42,17 @@ CASE_TYPES = [
     CaseTypes.DEATHS_PER_CAPITA,
 ]
 
+# Keys are what's in the COVID data, values are what we want to rename them to (to
+# match the names in the geo data)
+COUNTRY_RENAMES = {
+    "Bosnia": "Bosnia and Herzegovina",
+    "Georgia (country)": "Georgia",
+    "North Macedonia": "Macedonia",
+    "S. Sudan": "South Sudan",
+}
+
 
+@functools.lru_cache(None)
 def get_countries_geo_df() -> geopandas.GeoDataFrame:
     """Get geometry and long/lat coords for world countries
 
@@ -36,33 +64,27 @@ def get_countries_geo_df() -> geopandas.GeoDataFrame:
     :rtype: geopandas.GeoDataFrame
     """
 
-    geo_df: geopandas.GeoDataFrame = geopandas.read_file(
-        GEO_DATA_DIR / "ne_110m_admin_0_map_units" / "ne_110m_admin_0_map_units.shp"
-    )
+    geo_df: geopandas.GeoDataFrame = geopandas.read_file(COUNTRIES_SHAPEFILE)
 
     geo_df = geo_df.rename(columns={"ADMIN": CODE}, errors="raise")
 
     # Keys are what's in the geo df, values are what we want to rename them to
     # Values must match the names in the original data source. If you don't like those
     # names, change them there and then come back and change the values here.
-    geo_df[CODE] = (
-        geo_df[CODE]
-        .map(
-            {
-                "Central African Republic": "Central African Rep.",
-                "Democratic Republic of the Congo": "Dem. Rep. Congo",
-                "Equatorial Guinea": "Eq. Guinea",
-                "eSwatini": "Eswatini",
-                "Georgia (Country)": "Georgia",
-                "Republic of Serbia": "Serbia",
-                "United Arab Emirates": "UAE",
-                "United Kingdom": "Britain",
-                "United Republic of Tanzania": "Tanzania",
-                "Western Sahara": "W. Sahara",
-                "United States of America": "United States",
-            }
-        )
-        .fillna(geo_df[CODE])
+    geo_df[CODE] = geo_df[CODE].replace(
+        {
+            "Central African Republic": "Central African Rep.",
+            "Democratic Republic of the Congo": "Dem. Rep. Congo",
+            "Equatorial Guinea": "Eq. Guinea",
+            "eSwatini": "Eswatini",
+            "Georgia (Country)": "Georgia",
+            "Republic of Serbia": "Serbia",
+            "United Arab Emirates": "UAE",
+            "United Kingdom": "Britain",
+            "United Republic of Tanzania": "Tanzania",
+            "Western Sahara": "W. Sahara",
+            "United States of America": "United States",
+        }
     )
     geo_df = geo_df[geo_df[CODE] != "Antarctica"]
 
@@ -186,6 +208,7 @@ def get_countries_geo_df() -> geopandas.GeoDataFrame:
     return geo_df
 
 
+@functools.lru_cache(None)
 def get_usa_states_geo_df() -> geopandas.GeoDataFrame:
     """Get geometry and long/lat coords for each US state
 
@@ -194,9 +217,9 @@ def get_usa_states_geo_df() -> geopandas.GeoDataFrame:
     :rtype: geopandas.GeoDataFrame
     """
 
-    geo_df: geopandas.GeoDataFrame = geopandas.read_file(
-        GEO_DATA_DIR / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
-    ).rename(columns={"STUSPS": CODE}, errors="raise")
+    geo_df: geopandas.GeoDataFrame = geopandas.read_file(USA_STATES_SHAPEFILE).rename(
+        columns={"STUSPS": CODE}, errors="raise"
+    )
 
     geo_df = geo_df[
         [
@@ -216,30 +239,64 @@ def get_usa_states_geo_df() -> geopandas.GeoDataFrame:
     return geo_df
 
 
-def nan_to_none(x):
-    return None if pd.isna(x) else x
+def to_json_array(s: pd.Series) -> Union[np.ndarray, list]:
+    # orjson serializes numeric arrays natively, so only when there are NaNs to turn
+    # into nulls do we need to box the values into a list of Python objects. Even then,
+    # go straight to a list and patch the (few) NaNs rather than build object arrays.
+    if s.hasnans:
+        values = s.tolist()
+        for i in np.flatnonzero(s.isna().to_numpy()):
+            values[i] = None
+        return values
+
+    return np.ascontiguousarray(s.to_numpy())
 
 
 def jsonify(s):
     return s.lower().replace(" ", "_").replace("cap.", "capita")
 
 
+def to_json_bytes(data) -> bytes:
+    # orjson serializes numpy scalars (and arrays) natively and writes NaN as null
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 def save_file_with_digest(filename_stub, data):
-    data_str = json.dumps(data)
+    save_chunks_with_digest(filename_stub, [to_json_bytes(data)])
+
+
+def save_chunks_with_digest(filename_stub, chunks: Iterable[bytes]):
+    # We don't know the digest (and hence the file name) until we've seen every chunk,
+    # so write to a temp file as we go and move it into place at the end
     hasher = hashlib.sha1()
-    hasher.update(data_str.encode())
+    with tempfile.NamedTemporaryFile("wb", dir=DATA_DIR, delete=False) as f:
+        temp_path = Path(f.name)
+        try:
+            for chunk in chunks:
+                hasher.update(chunk)
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            temp_path.unlink()
+            raise
+
+    # NamedTemporaryFile creates the file as 0600; give it the permissions a plain
+    # open() would have
+    umask = os.umask(0)
+    os.umask(umask)
+    temp_path.chmod(0o666 & ~umask)
+
     digest = hasher.hexdigest()
     digest_pattern = f"[a-fA-F0-9]{{{len(digest)}}}"
 
     existing_data_file_name = None
     for f in DATA_DIR.iterdir():
-        if re.match(filename_stub.format(digest_pattern), f.name):
+        if re.fullmatch(filename_stub.format(digest_pattern), f.name):
             existing_data_file_name = f.name
             break
 
     new_data_file_name = filename_stub.format(digest)
-    with (DATA_DIR / new_data_file_name).open("w") as f:
-        json.dump(data, f, indent=0)
+    temp_path.replace(DATA_DIR / new_data_file_name)
 
     with (Paths.DOCS / "html" / "plots.ts").open() as f:
         ts_file_contents = f.read()
@@ -265,62 +322,233 @@ def save_file_with_digest(filename_stub, data):
         (DATA_DIR / existing_data_file_name).unlink()
 
 
-def data_to_json():
-    df: pd.DataFrame = pd.read_csv(Paths.DATA_TABLE, low_memory=False)
+def iter_scope_json_chunks(
+    agg: dict, dates: List[str], location_data: Iterable[Tuple[str, dict]]
+) -> Iterator[bytes]:
+    """Serialize a scope's (usa's, world's) data as JSON, one location at a time
+
+    Produces the same bytes as `to_json_bytes({"agg": agg, "dates": dates, "data":
+    dict(location_data)})`, but without requiring every location's data to be in memory
+    at once
+
+    :param agg: The aggregate stats for the scope
+    :type agg: dict
+    :param dates: The scope's dates, which locations' date codes index into
+    :type dates: List[str]
+    :param location_data: (code, data) pairs, one per location in the scope
+    :type location_data: Iterable[Tuple[str, dict]]
+    :return: An iterator of chunks of the serialized JSON
+    :rtype: Iterator[bytes]
+    """
+
+    yield b'{"agg":'
+    yield to_json_bytes(agg)
+    yield b',"dates":'
+    yield to_json_bytes(dates)
+    yield b',"data":{'
+    for i, (code, loc_data) in enumerate(location_data):
+        if i > 0:
+            yield b","
+        yield to_json_bytes(code) + b":" + to_json_bytes(loc_data)
+    yield b"}}"
+
+
+def iter_scope_jsonl_chunks(
+    agg: dict, dates: List[str], location_data: Iterable[Tuple[str, dict]]
+) -> Iterator[bytes]:
+    """Serialize a scope's (usa's, world's) data as JSON Lines
+
+    The first line is `{"agg": agg, "dates": dates}`, and each subsequent line is one
+    location's data, with its code under the key `"code"`. Unlike the single JSON
+    object produced by `iter_scope_json_chunks`, this can be consumed one location at
+    a time.
+
+    :param agg: The aggregate stats for the scope
+    :type agg: dict
+    :param dates: The scope's dates, which locations' date codes index into
+    :type dates: List[str]
+    :param location_data: (code, data) pairs, one per location in the scope
+    :type location_data: Iterable[Tuple[str, dict]]
+    :return: An iterator of lines of JSON, newlines included
+    :rtype: Iterator[bytes]
+    """
+
+    yield to_json_bytes({"agg": agg, "dates": dates}) + b"\n"
+    for code, loc_data in location_data:
+        yield to_json_bytes({"code": code, **loc_data}) + b"\n"
+
+
+def read_data_table() -> pd.DataFrame:
+    """Read the data table, using pyarrow's (multithreaded) CSV reader if available
+
+    :return: The data table, with the same dtypes `pd.read_csv` would give it
+    :rtype: pd.DataFrame
+    """
+
+    if pyarrow is None:
+        return pd.read_csv(Paths.DATA_TABLE, low_memory=False)
+
+    # Match pd.read_csv: string columns (dates included) are left as strings, and
+    # empty cells are null
+    string_cols = [
+        Columns.STATE,
+        Columns.COUNTRY,
+        Columns.TWO_LETTER_STATE_CODE,
+        Columns.DATE,
+    ]
+    table = pyarrow.csv.read_csv(
+        Paths.DATA_TABLE,
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={col: pyarrow.string() for col in string_cols},
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def data_files_are_stale(patterns: List[str], sources: List[Path]) -> bool:
+    """Check whether generated data files need to be regenerated from their sources
+
+    :param patterns: Globs (relative to `DATA_DIR`) for the generated files; each
+    must match at least one file
+    :type patterns: List[str]
+    :param sources: The files the generated files are made from
+    :type sources: List[Path]
+    :return: Whether any of the generated files is missing or older than any source
+    :rtype: bool
+    """
+
+    data_mtimes = []
+    for pattern in patterns:
+        files = list(DATA_DIR.glob(pattern))
+        if not files:
+            return True
+        data_mtimes.extend(f.stat().st_mtime for f in files)
+
+    return max(p.stat().st_mtime for p in sources) > min(data_mtimes)
+
+
+def geo_data_is_stale() -> bool:
+    """Check whether the geo data file needs to be regenerated
+
+    The geo data comes from shapefiles that essentially never change, so there's no
+    need to reread and reserialize them every time the covid data is updated. It's
+    stale if it doesn't exist or if it's older than the shapefiles or this file.
+
+    :return: Whether the geo data file is missing or out of date
+    :rtype: bool
+    """
+
+    return data_files_are_stale(
+        ["geo_data-*.json"],
+        [COUNTRIES_SHAPEFILE, USA_STATES_SHAPEFILE, Path(__file__)],
+    )
+
+
+def covid_data_is_stale(*, ext: str = "json") -> bool:
+    """Check whether the covid data files need to be regenerated
+
+    They're stale if either scope's file doesn't exist or if any of them is older than
+    the data table or this file.
+
+    :param ext: The extension of the files to check ("json", "jsonl", "feather"),
+    defaults to "json"
+    :type ext: str, optional
+    :return: Whether the covid data files are missing or out of date
+    :rtype: bool
+    """
+
+    return data_files_are_stale(
+        [f"covid_data-{scope}-*.{ext}" for scope in ["usa", "world"]],
+        [Paths.DATA_TABLE, Path(__file__)],
+    )
+
+
+def get_scope_dfs() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read the data table and split it into the usa (states) and world scopes
+
+    :return: The usa and world data, each with a location "name" and "code" column
+    :rtype: Tuple[pd.DataFrame, pd.DataFrame]
+    """
+
+    df: pd.DataFrame = read_data_table()
     for c in df:
         if "per cap." in c.lower():
             df[c] *= 100000
 
-    is_state = df[Columns.STATE].notna()
+    # Select rows by position with `take`, which gathers each block directly rather
+    # than going through boolean-mask indexing
+    is_state = df[Columns.STATE].notna().to_numpy()
+    is_world = (
+        df[Columns.COUNTRY]
+        .isin([Locations.WORLD, Locations.WORLD_MINUS_CHINA])
+        .to_numpy()
+    )
     usa_df = (
-        df[is_state]
+        df.take(np.flatnonzero(is_state))
         .drop(columns=Columns.COUNTRY)
         .rename(columns={Columns.STATE: "name", Columns.TWO_LETTER_STATE_CODE: "code"})
     )
-    countries_df = df[
-        (~is_state)
-        & (~df[Columns.COUNTRY].isin([Locations.WORLD, Locations.WORLD_MINUS_CHINA]))
-    ].drop(columns=[Columns.STATE, Columns.TWO_LETTER_STATE_CODE])
+    countries_df = df.take(np.flatnonzero(~is_state & ~is_world)).drop(
+        columns=[Columns.STATE, Columns.TWO_LETTER_STATE_CODE]
+    )
+    # Only the (~200) categories get renamed, not every row
     countries_df[Columns.COUNTRY] = (
         countries_df[Columns.COUNTRY]
-        .map(
-            {
-                "Bosnia": "Bosnia and Herzegovina",
-                "Georgia (country)": "Georgia",
-                "North Macedonia": "Macedonia",
-                "S. Sudan": "South Sudan",
-            }
-        )
-        .fillna(countries_df[Columns.COUNTRY])
+        .astype("category")
+        .cat.rename_categories(lambda c: COUNTRY_RENAMES.get(c, c))
     )
     countries_df = countries_df.rename(columns={Columns.COUNTRY: "name"})
 
-    countries_geo_df = get_countries_geo_df()
+    countries_df[CODE] = countries_df.merge(
+        get_countries_geo_df(), how="left", on="name"
+    )[CODE].values
 
-    countries_df[CODE] = countries_df.merge(countries_geo_df, how="left", on="name")[
-        CODE
-    ].values
+    return usa_df, countries_df
 
-    usa_geo_df = get_usa_states_geo_df()
-    usa_geo_df["name"] = usa_geo_df.merge(
-        usa_df.groupby([CODE, "name"]).first().index.to_frame(index=False),
-        how="left",
-        on=CODE,
-    )["name"]
 
-    data = {}
-    for df_name, df in [("usa", usa_df), ("world", countries_df)]:
+def data_to_json(*, force: bool = False, force_geo: bool = False, jsonl: bool = False):
+    """Write the covid data and the geo data to JSON files for the web
+
+    Files are only regenerated when they're stale, i.e., older than what they're
+    generated from (see `covid_data_is_stale` and `geo_data_is_stale`); if neither is,
+    this doesn't even read the data table.
+
+    :param force: Whether to regenerate the covid data files even if they're not
+    stale, defaults to False
+    :type force: bool, optional
+    :param force_geo: Whether to regenerate the geo data file even if it's not stale,
+    defaults to False
+    :type force_geo: bool, optional
+    :param jsonl: Whether to write the covid data as JSON Lines (`.jsonl`, one
+    location per line; see `iter_scope_jsonl_chunks`) instead of JSON, defaults to
+    False. The web page reads the JSON files.
+    :type jsonl: bool, optional
+    """
+
+    write_covid_data = force or covid_data_is_stale(ext="jsonl" if jsonl else "json")
+    write_geo_data = force_geo or geo_data_is_stale()
+    if not (write_covid_data or write_geo_data):
+        return
+
+    usa_df, countries_df = get_scope_dfs()
+
+    scopes = [("usa", usa_df), ("world", countries_df)]
+    if not write_covid_data:
+        # Only the geo data needs regenerating
+        scopes = []
+
+    for df_name, df in scopes:
 
-        data[df_name] = {}
+        agg = {}
 
         agg_methods = ["min", "max"]
         agg_stats: pd.DataFrame = df[[Columns.DATE, *CASE_TYPES]].agg(
             agg_methods
         ).rename(columns=jsonify)
-        data[df_name]["agg"] = {}
-        data[df_name]["agg"]["net"] = agg_stats.to_dict("dict")
+        agg["net"] = agg_stats.to_dict("dict")
 
-        data[df_name]["agg"]["net"][jsonify(Columns.DATE)]["min_nonzero"] = df.loc[
+        agg["net"][jsonify(Columns.DATE)]["min_nonzero"] = df.loc[
             df[CaseTypes.CONFIRMED] > 0, Columns.DATE
         ].min()
 
@@ -329,12 +557,11 @@ def data_to_json():
             if int(min_val) == min_val:
                 min_val = int(min_val)
 
-            data[df_name]["agg"]["net"][jsonify(ct)]["min_nonzero"] = min_val
+            agg["net"][jsonify(ct)]["min_nonzero"] = min_val
 
-        dodd_diffs = df[CASE_TYPES].diff().fillna(0)
-        for ct in CASE_TYPES:
-            dodd_diffs.loc[dodd_diffs[ct] < 0, ct] = 0
-        data[df_name]["agg"]["dodd"] = (
+        # Negative day-over-day diffs are data corrections; clamp them to 0
+        dodd_diffs = df[CASE_TYPES].diff().fillna(0).clip(lower=0)
+        agg["dodd"] = (
             dodd_diffs.agg(agg_methods).rename(columns=jsonify).to_dict("dict")
         )
 
@@ -348,7 +575,7 @@ def data_to_json():
             if int(min_val) == min_val:
                 min_val = int(min_val)
 
-            data[df_name]["agg"]["dodd"][jsonify(ct)]["min_nonzero"] = min_val
+            agg["dodd"][jsonify(ct)]["min_nonzero"] = min_val
 
         outbreak_cutoffs = {
             "Cases": 100,
@@ -358,36 +585,104 @@ def data_to_json():
         }
 
         for k in ["dodd", "net"]:
-            data[df_name]["agg"][k]["outbreak_cutoffs"] = {
+            agg[k]["outbreak_cutoffs"] = {
                 jsonify(k): v for k, v in outbreak_cutoffs.items()
             }
 
-        data[df_name]["data"] = {}
-        d = data[df_name]["data"]
-        for code, g in df.groupby(CODE):
-            d[code] = {"net": {}}
-            d[code]["outbreak_cutoffs"] = {}
-            g = g.copy()
-
-            for col in g.columns:
-                if col in [CODE, "name"]:
-                    continue
-
-                if col == Columns.DATE:
-                    elem = {k: i for i, k in enumerate(g[col].tolist())}
-                    d[code][jsonify(col)] = elem
-                else:
-                    elem = list(map(nan_to_none, g[col].tolist()))
-                    outbreak_start_idx = int((g[col] < outbreak_cutoffs[ct]).sum())
-                    d[code]["outbreak_cutoffs"][jsonify(col)] = outbreak_start_idx
-                    d[code]["net"][jsonify(col)] = elem
-
-    geojson = {"usa": usa_geo_df._to_geo(), "world": countries_geo_df._to_geo()}
+        # Every location repeats (a subset of) the same few hundred dates, so rather
+        # than write them all out for each location, write them once per scope and
+        # give each location the dates' (integer) codes
+        df = df.assign(**{Columns.DATE: df[Columns.DATE].astype("category")})
+        dates = df[Columns.DATE].cat.categories.tolist()
+
+        # Canonicalize output column names once per scope, not once per location
+        json_col_names = {
+            col: jsonify(col) for col in df.columns if col not in [CODE, "name"]
+        }
+
+        # Count every location's pre-outbreak days in one pass over the whole scope
+        # instead of one comparison per (location, column)
+        value_cols = [col for col in json_col_names if col != Columns.DATE]
+        outbreak_start_idxs = (
+            (df[value_cols] < outbreak_cutoffs[ct]).groupby(df[CODE]).sum()
+        )
+
+        def iter_location_data() -> Iterator[Tuple[str, dict]]:
+            for code, g in df.groupby(CODE):
+                loc_data = {"net": {}}
+                loc_data["outbreak_cutoffs"] = {}
+
+                for col, json_col in json_col_names.items():
+                    if col == Columns.DATE:
+                        loc_data[json_col] = to_json_array(g[col].cat.codes)
+                    else:
+                        elem = to_json_array(g[col])
+                        outbreak_start_idx = int(outbreak_start_idxs.at[code, col])
+                        loc_data["outbreak_cutoffs"][json_col] = outbreak_start_idx
+                        loc_data["net"][json_col] = elem
+
+                yield code, loc_data
+
+        # Each scope gets its own file so that neither has to be serialized (or parsed
+        # client-side) as part of one giant blob. Within a scope, locations are
+        # serialized one at a time, so we never hold every location's data at once.
+        if jsonl:
+            save_chunks_with_digest(
+                f"covid_data-{df_name}-{{}}.jsonl",
+                iter_scope_jsonl_chunks(agg, dates, iter_location_data()),
+            )
+        else:
+            save_chunks_with_digest(
+                f"covid_data-{df_name}-{{}}.json",
+                iter_scope_json_chunks(agg, dates, iter_location_data()),
+            )
+
+    if not write_geo_data:
+        return
+
+    # Copy, since we're about to modify it and it's cached
+    usa_geo_df = get_usa_states_geo_df().copy()
+    usa_geo_df["name"] = usa_geo_df.merge(
+        usa_df.groupby([CODE, "name"]).first().index.to_frame(index=False),
+        how="left",
+        on=CODE,
+    )["name"]
+
+    geojson = {
+        "usa": usa_geo_df._to_geo(),
+        "world": get_countries_geo_df()._to_geo(),
+    }
     save_file_with_digest("geo_data-{}.json", geojson)
 
-    save_file_with_digest("covid_data-{}.json", data)
 
-    return data
+def data_to_feather(*, force: bool = False):
+    """Write the covid data to Feather (Arrow IPC) files, one per scope
+
+    Unlike the JSON files, these hold the data as typed columns (one row per location
+    and date) that Arrow readers can use without parsing. Requires pyarrow.
+
+    :param force: Whether to regenerate the files even if they're not stale, defaults
+    to False
+    :type force: bool, optional
+    """
+
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to write Feather files")
+
+    if not (force or covid_data_is_stale(ext="feather")):
+        return
+
+    usa_df, countries_df = get_scope_dfs()
+    for df_name, df in [("usa", usa_df), ("world", countries_df)]:
+        df = df.assign(**{Columns.DATE: pd.to_datetime(df[Columns.DATE])})
+
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.feather.write_feather(
+            df.reset_index(drop=True), sink, compression="lz4"
+        )
+        save_chunks_with_digest(
+            f"covid_data-{df_name}-{{}}.feather", [sink.getvalue().to_pybytes()]
+        )
 
 
 if __name__ == "__main__":
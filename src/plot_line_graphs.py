@@ -1,8 +1,9 @@
 # %%
+import functools
 import itertools
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import matplotlib
 import matplotlib.pyplot as plt
@@ -10,7 +11,11 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 from IPython.display import display  # noqa F401
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
 from matplotlib.dates import DateFormatter, DayLocator
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
 from matplotlib.legend import Legend
 from matplotlib.ticker import (
     LogLocator,
@@ -21,7 +26,6 @@ from matplotlib.ticker import (
 from typing_extensions import Literal
 
 from constants import (
-    ABCStrictEnum,
     CaseInfo,
     CaseTypes,
     Columns,
@@ -45,13 +49,68 @@ from plotting_utils import (
 
 matplotlib.use("agg")
 
+# All graphs made in a run show the same "last updated" time
+RUN_TIMESTAMP = datetime.now(timezone.utc).strftime(r"%b %-d, %Y at %H:%M UTC")
 
-class EdgeGuide(ABCStrictEnum):
-    """An enum whose cases represent which edge of the graph text is to be aligned with
+# Keys are (text, font properties, figure dpi), values are the (width, height) of the
+# rendered text in display units
+_TEXT_SIZE_CACHE: Dict[Tuple[str, FontProperties, float], Tuple[float, float]] = {}
+
+# Keys are id(df_with_china), values are (df_with_china, its color mapping); the frame
+# is kept alive (and checked with `is`) so that its id can't be reused by another frame.
+# Only the most recently added frames are kept, so that old ones can be freed
+_COLOR_MAPPING_CACHE: Dict[int, Tuple[pd.DataFrame, LocationColorMapping]] = {}
+_COLOR_MAPPING_CACHE_MAXSIZE = 4
+
+# How to format case counts in the legend, by count type
+_CASE_COUNT_FORMATTERS: Dict[Counting, Callable[[float], str]] = {
+    Counting.TOTAL_CASES: r"{:,.0f}".format,
+    Counting.PER_CAPITA: r"{:.2e}".format,
+}
+
+
+def _get_text_sizes(
+    fig: plt.Figure, ax: plt.Axes, texts: List[str], fontproperties: FontProperties
+) -> np.ndarray:
+    """Get the sizes of the given texts when rendered (unrotated) on the given axes
+
+    Measuring text requires laying it out, which is slow, and the same few strings are
+    measured for every graph, so sizes are cached. Texts that aren't cached yet are
+    measured together, with a single renderer.
+
+    :param fig: The figure containing the axes
+    :type fig: plt.Figure
+    :param ax: The axes the texts will be drawn on
+    :type ax: plt.Axes
+    :param texts: The texts to measure
+    :type texts: List[str]
+    :param fontproperties: The font the texts will be drawn in
+    :type fontproperties: FontProperties
+    :return: An array whose rows are the (width, height) of each text, in display units
+    :rtype: np.ndarray
     """
 
-    RIGHT: "EdgeGuide" = "right"
-    TOP: "EdgeGuide" = "top"
+    keys = [(text, fontproperties, fig.dpi) for text in texts]
+    sizes = {key: _TEXT_SIZE_CACHE[key] for key in keys if key in _TEXT_SIZE_CACHE}
+    uncached_keys = [key for key in dict.fromkeys(keys) if key not in sizes]
+
+    if uncached_keys:
+        # Place the texts in axes coords; in data coords they'd have no extent on
+        # log axes, whose origin is at -inf
+        plotted_texts = [
+            ax.text(0, 0, text, fontproperties=fontproperties, transform=ax.transAxes)
+            for text, _, _ in uncached_keys
+        ]
+        renderer = fig.canvas.get_renderer()
+        for key, plotted_text in zip(uncached_keys, plotted_texts):
+            text_box = plotted_text.get_window_extent(renderer)
+            sizes[key] = (text_box.width, text_box.height)
+            # Don't let a bad measurement stick around for the rest of the run
+            if np.isfinite(sizes[key]).all():
+                _TEXT_SIZE_CACHE[key] = sizes[key]
+            plotted_text.remove()
+
+    return np.array([sizes[key] for key in keys])
 
 
 def _add_doubling_time_lines(
@@ -106,13 +165,30 @@ def _add_doubling_time_lines(
         dc_y_upper_lim = dc_to_ac.inverted().transform((0, 1.1))[1]
         ax.set_ylim(dc_y_lower_lim, dc_y_upper_lim)
 
+        # The limits are fixed from here on, and so is dc_to_ac. It's a non-affine part
+        # (the log scale, if there is one) followed by an affine part, so snapshot the
+        # latter's matrix once and apply it ourselves instead of going through
+        # matplotlib's (composite) transform machinery for every point
+        dc_to_ac_non_affine = dc_to_ac.transform_non_affine
+        dc_to_ac_matrix = dc_to_ac.get_affine().get_matrix()
+
+        def transform_dc_to_ac(
+            dc_xs: np.ndarray, dc_ys: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray]:
+            xs, ys = dc_to_ac_non_affine(np.column_stack([dc_xs, dc_ys])).T
+            m = dc_to_ac_matrix
+            return (
+                m[0, 0] * xs + m[0, 1] * ys + m[0, 2],
+                m[1, 0] * xs + m[1, 1] * ys + m[1, 2],
+            )
+
         # Getting min x,y bounds of lines is easy
         dc_x_min = 0
         dc_y_min = CaseInfo.get_info_item_for(
             InfoField.THRESHOLD, stage=stage, count=count
         )
 
-        ac_x_min, ac_y_min = dc_to_ac.transform((dc_x_min, dc_y_min))
+        (ac_x_min,), (ac_y_min,) = transform_dc_to_ac([dc_x_min], [dc_y_min])
 
         # Getting max x,y bounds is trickier due to needing to use the maximum
         # extent of the graph area
@@ -120,38 +196,37 @@ def _add_doubling_time_lines(
         # texts' boxes clipping the axes, we move things in just a hair)
         ac_x_upper_lim = ac_y_upper_lim = 1
 
+        # The lines' geometry is computed for all doubling times at once; only the
+        # plotting (and text placement) below is done line by line
         doubling_times = [1, 2, 3, 4, 7, 14]  # days (x-axis units)
-        for dt in doubling_times:
-            # Simple math: assuming dc_y_max := dc_y_upper_lim, then if
-            # dc_y_max = dc_y_min * 2**((dc_x_max-dc_x_min)/dt),
-            # then...
-            dc_x_max = dc_x_min + dt * np.log2(dc_y_upper_lim / dc_y_min)
-            ac_x_max, ac_y_max = dc_to_ac.transform((dc_x_max, dc_y_upper_lim))
-
-            # We try to use ac_y_max=1 by default, and if that leads to too long a line
-            # (sticking out through the right side of the graph) then we use ac_x_max=1
-            # instead and compute ac_y_max accordingly
-            if ac_x_max > ac_x_upper_lim:
-                dc_y_max = dc_y_min * 2 ** ((dc_x_upper_lim - dc_x_min) / dt)
-                ac_x_max, ac_y_max = dc_to_ac.transform((dc_x_upper_lim, dc_y_max))
-                edge = EdgeGuide.RIGHT
-            else:
-                edge = EdgeGuide.TOP
+        dts = np.array(doubling_times)
+
+        # Simple math: assuming dc_y_max := dc_y_upper_lim, then if
+        # dc_y_max = dc_y_min * 2**((dc_x_max-dc_x_min)/dt),
+        # then...
+        dc_x_maxs = dc_x_min + dts * np.log2(dc_y_upper_lim / dc_y_min)
+        ac_x_maxs, _ = transform_dc_to_ac(dc_x_maxs, np.full(len(dts), dc_y_upper_lim))
+
+        # We try to use ac_y_max=1 by default, and if that leads to too long a line
+        # (sticking out through the right side of the graph) then we use ac_x_max=1
+        # instead and compute ac_y_max accordingly
+        uses_right_edge = ac_x_maxs > ac_x_upper_lim
+        dc_x_maxs = np.where(uses_right_edge, dc_x_upper_lim, dc_x_maxs)
+        dc_y_maxs = np.where(
+            uses_right_edge,
+            dc_y_min * 2 ** ((dc_x_upper_lim - dc_x_min) / dts),
+            dc_y_upper_lim,
+        )
+        ac_x_maxs, ac_y_maxs = transform_dc_to_ac(dc_x_maxs, dc_y_maxs)
 
-            # Plot the lines themselves
-            ax.plot(
-                [ac_x_min, ac_x_max],
-                [ac_y_min, ac_y_max],
-                transform=ax.transAxes,
-                color="0.0",
-                alpha=0.7,
-                dashes=(1, 2),
-                linewidth=1,
-            )
+        ac_line_slopes = (ac_y_maxs - ac_y_min) / (ac_x_maxs - ac_x_min)
+        ac_text_angles_rad = np.arctan(ac_line_slopes)
+        sin_ac_angles = np.sin(ac_text_angles_rad)
+        cos_ac_angles = np.cos(ac_text_angles_rad)
 
-            # Annotate lines with assocated doubling times
-
-            # Get text to annotate with
+        # Get text to annotate each line with
+        annot_text_strs = []
+        for dt in doubling_times:
             n_weeks, weekday = divmod(dt, 7)
             if weekday == 0:
                 annot_text_str = f"{n_weeks} week"
@@ -162,100 +237,176 @@ def _add_doubling_time_lines(
                 if dt != 1:
                     annot_text_str += "s"
 
-            text_props = {
-                "bbox": {
-                    "fc": "1.0",
-                    "pad": 0,
-                    # "edgecolor": "1.0",
-                    "alpha": 0.7,
-                    "lw": 0,
-                }
+            annot_text_strs.append(annot_text_str)
+
+        text_props = {
+            "bbox": {
+                "fc": "1.0",
+                "pad": 0,
+                # "edgecolor": "1.0",
+                "alpha": 0.7,
+                "lw": 0,
             }
+        }
+
+        # The default font (which depends on the current style)
+        text_fontproperties = FontProperties()
+
+        # As with the lines' endpoints, the texts' placement is computed for all lines
+        # at once
+
+        # Get the unrotated text box sizes (in axes coords, so relative to the axes'
+        # size)
+        text_sizes = _get_text_sizes(fig, ax, annot_text_strs, text_fontproperties)
+        ac_text_widths = text_sizes[:, 0] / ax.bbox.width
+        ac_text_heights = text_sizes[:, 1] / ax.bbox.height
+
+        # Compute the width and height of the upright rectangle bounding the rotated
+        # text box in axis coordinates
+        # Simple geometry (a decent high school math problem)
+        # We cheat a bit; to create some padding between the rotated text box and
+        # the axes, we can add the padding directly to the width and height of the
+        # upright rectangle bounding the rotated text box
+        # This works because the origin of the rotated text box is in the lower left
+        # corner of the upright bounding rectangle, so anything added to these
+        # dimensions gets added to the top and right, pushing it away from the axes
+        # and producing the padding we want
+        # If we wanted to do this the "right" way we'd *redo* the calculations above
+        # but with ac_x_upper_lim = ac_y_upper_lim = 1 - padding
+        PADDING = 0.005
+        ac_rot_text_widths = (
+            (ac_text_widths * cos_ac_angles)
+            + (ac_text_heights * sin_ac_angles)
+            + PADDING
+        )
+        ac_rot_text_heights = (
+            (ac_text_widths * sin_ac_angles)
+            + (ac_text_heights * cos_ac_angles)
+            + PADDING
+        )
 
-            # Plot in a temporary location just to get the text box size; we'll move and
-            # rotate later
-            plotted_text = ax.text(
-                0, 0, annot_text_str, text_props, transform=ax.transAxes
-            )
+        # Perpendicular distance from text to corresponding line
+        AC_DIST_FROM_LINE = 0.005
+        # Get text box origin relative to line upper endpoint, for lines that use the
+        # right edge as a guide
+        # Account for bit of overhang; when slanted, top left corner of the text box
+        # extends left of the bottom left corner, which is its origin
+        # Subtracting that bit of overhang (height * sin(theta)) gets us the x-origin
+        # This only applies to the x coord; the bottom left corner of the text box is
+        # also the bottom of the rotated rectangle
+        right_ac_text_origin_xs = ac_x_maxs - (
+            ac_rot_text_widths - ac_text_heights * sin_ac_angles
+        )
+        right_ac_text_origin_ys = (
+            ac_y_min
+            + (right_ac_text_origin_xs - ac_x_min) * ac_line_slopes
+            + AC_DIST_FROM_LINE / cos_ac_angles
+        )
 
-            ac_line_slope = (ac_y_max - ac_y_min) / (ac_x_max - ac_x_min)
-            ac_text_angle_rad = np.arctan(ac_line_slope)
-            sin_ac_angle = np.sin(ac_text_angle_rad)
-            cos_ac_angle = np.cos(ac_text_angle_rad)
-
-            # Get the unrotated text box bounds
-            ac_text_box = plotted_text.get_window_extent(
-                fig.canvas.get_renderer()
-            ).transformed(ax.transAxes.inverted())
-            ac_text_width = ac_text_box.x1 - ac_text_box.x0
-            ac_text_height = ac_text_box.y1 - ac_text_box.y0
-
-            # Compute the width and height of the upright rectangle bounding the rotated
-            # text box in axis coordinates
-            # Simple geometry (a decent high school math problem)
-            # We cheat a bit; to create some padding between the rotated text box and
-            # the axes, we can add the padding directly to the width and height of the
-            # upright rectangle bounding the rotated text box
-            # This works because the origin of the rotated text box is in the lower left
-            # corner of the upright bounding rectangle, so anything added to these
-            # dimensions gets added to the top and right, pushing it away from the axes
-            # and producing the padding we want
-            # If we wanted to do this the "right" way we'd *redo* the calculations above
-            # but with ac_x_upper_lim = ac_y_upper_lim = 1 - padding
-            PADDING = 0.005
-            ac_rot_text_width = (
-                (ac_text_width * cos_ac_angle)
-                + (ac_text_height * sin_ac_angle)
-                + PADDING
-            )
-            ac_rot_text_height = (
-                (ac_text_width * sin_ac_angle)
-                + (ac_text_height * cos_ac_angle)
-                + PADDING
+        # If text box is in very top right of graph, it may use only the right
+        # edge of the graph as a guide and hence clip through the top; if that
+        # happens, it's effectively the same situation as using the top edge from
+        # the start
+        uses_top_edge = (~uses_right_edge) | (
+            right_ac_text_origin_ys + ac_rot_text_heights > ac_y_upper_lim
+        )
+        top_ac_text_origin_ys = ac_y_upper_lim - ac_rot_text_heights
+        top_ac_text_origin_xs = (
+            ac_x_min
+            - AC_DIST_FROM_LINE / sin_ac_angles
+            + (top_ac_text_origin_ys - ac_y_min) / ac_line_slopes
+        )
+
+        ac_text_origin_xs = np.where(
+            uses_top_edge, top_ac_text_origin_xs, right_ac_text_origin_xs
+        )
+        ac_text_origin_ys = np.where(
+            uses_top_edge, top_ac_text_origin_ys, right_ac_text_origin_ys
+        )
+
+        # Plot the lines themselves, as a single collection
+        ax.add_collection(
+            LineCollection(
+                [
+                    [(ac_x_min, ac_y_min), (ac_x_max, ac_y_max)]
+                    for ac_x_max, ac_y_max in zip(ac_x_maxs, ac_y_maxs)
+                ],
+                transform=ax.transAxes,
+                colors="0.0",
+                alpha=0.7,
+                linestyles=[(0, (1, 2))],
+                linewidths=1,
+            ),
+            autolim=False,
+        )
+
+        for (
+            annot_text_str,
+            ac_text_origin_x,
+            ac_text_origin_y,
+            ac_text_angle_rad,
+        ) in zip(
+            annot_text_strs,
+            ac_text_origin_xs,
+            ac_text_origin_ys,
+            ac_text_angles_rad,
+        ):
+            # Annotate lines with assocated doubling times
+            ax.text(
+                ac_text_origin_x,
+                ac_text_origin_y,
+                annot_text_str,
+                text_props,
+                transform=ax.transAxes,
+                fontproperties=text_fontproperties,
+                horizontalalignment="left",
+                verticalalignment="bottom",
+                rotation=ac_text_angle_rad * 180 / np.pi,  # takes degrees
+                rotation_mode="anchor",
             )
 
-            # Perpendicular distance from text to corresponding line
-            AC_DIST_FROM_LINE = 0.005
-            # Get text box origin relative to line upper endpoint
-            EdgeGuide.verify(edge)
-            if edge is EdgeGuide.RIGHT:
-                # Account for bit of overhang; when slanted, top left corner of the
-                # text box extends left of the bottom left corner, which is its origin
-                # Subtracting that bit of overhang (height * sin(theta)) gets us the
-                # x-origin
-                # This only applies to the x coord; the bottom left corner of the text
-                # box is also the bottom of the rotated rectangle
-                ac_text_origin_x = ac_x_max - (
-                    ac_rot_text_width - ac_text_height * sin_ac_angle
-                )
-                ac_text_origin_y = (
-                    ac_y_min
-                    + (ac_text_origin_x - ac_x_min) * ac_line_slope
-                    + AC_DIST_FROM_LINE / cos_ac_angle
-                )
+@functools.lru_cache(None)
+def _format_start_date(date: np.datetime64) -> str:
+    """Format a start date for the legend, e.g., "Mar 5"
 
-            # If text box is in very top right of graph, it may use only the right
-            # edge of the graph as a guide and hence clip through the top; if that
-            # happens, it's effectively the same situation as using the top edge from
-            # the start
-            if (
-                edge is EdgeGuide.TOP  # Must go first to short-circuit
-                or ac_text_origin_y + ac_rot_text_height > ac_y_upper_lim
-            ):
-                ac_text_origin_y = ac_y_upper_lim - ac_rot_text_height
-                ac_text_origin_x = (
-                    ac_x_min
-                    - AC_DIST_FROM_LINE / sin_ac_angle
-                    + (ac_text_origin_y - ac_y_min) / ac_line_slope
-                )
+    Cached because the same handful of start dates show up in legend after legend
+
+    :param date: The date to format
+    :type date: np.datetime64
+    :return: The formatted date
+    :rtype: str
+    """
+
+    return pd.Timestamp(date).strftime(r"%b %-d")
+
+
+def _format_series(
+    s: pd.Series, format_func: Callable[[Any], str], *, na_rep: Optional[str] = None
+) -> pd.Series:
+    """Format each element of the given series as a string
+
+    Equivalent to `s.map(format_func)` (with missing values replaced by `na_rep`, if
+    given), but iterates over the underlying array directly
+
+    :param s: The series to format
+    :type s: pd.Series
+    :param format_func: The function to format each element with
+    :type format_func: Callable[[Any], str]
+    :param na_rep: What to show for missing values; if None (the default), they're
+    passed to `format_func` like any other value
+    :type na_rep: Optional[str], optional
+    :return: The formatted series, with the same index as `s`
+    :rtype: pd.Series
+    """
 
-            # set_x and set_y work in axis coordinates
-            plotted_text.set_x(ac_text_origin_x)
-            plotted_text.set_y(ac_text_origin_y)
-            plotted_text.set_horizontalalignment("left")
-            plotted_text.set_verticalalignment("bottom")
-            plotted_text.set_rotation(ac_text_angle_rad * 180 / np.pi)  # takes degrees
-            plotted_text.set_rotation_mode("anchor")
+    values = s.to_numpy()
+    if na_rep is None:
+        strs = [format_func(v) for v in values]
+    else:
+        is_na = s.isna().to_numpy()
+        strs = [na_rep if na else format_func(v) for v, na in zip(values, is_na)]
+
+    return pd.Series(strs, index=s.index, dtype=object)
 
 
 def _format_legend(
@@ -311,13 +462,9 @@ def _format_legend(
         )
         legend_fields.append(this_case_type)
 
-        if count is Counting.TOTAL_CASES:
-            float_format_func = r"{:,.0f}".format
-        else:
-            float_format_func = r"{:.2e}".format
-
+        float_format_func = _CASE_COUNT_FORMATTERS[count]
         case_count_str_cols.append(
-            current_case_counts[this_case_type].map(float_format_func)
+            _format_series(current_case_counts[this_case_type], float_format_func)
         )
 
     if include_deaths:
@@ -326,13 +473,13 @@ def _format_legend(
         )
         legend_fields.append(this_case_type)
         case_count_str_cols.append(
-            current_case_counts[this_case_type].map(float_format_func)
+            _format_series(current_case_counts[this_case_type], float_format_func)
         )
 
     if include_start_date:
         legend_fields.append("Start Date")
         case_count_str_cols.append(
-            current_case_counts[START_DATE].dt.strftime(r"%b %-d")
+            _format_series(current_case_counts[START_DATE], _format_start_date)
         )
 
     if include_doubling_time:
@@ -345,15 +492,17 @@ def _format_legend(
                 legend_fields.append(f"From day {day_idx}")
 
             case_count_str_cols.append(
-                current_case_counts[form_doubling_time_colname(day_idx)].map(
-                    lambda x: "NA" if pd.isna(x) else r"{:.3g}d".format(x)
+                _format_series(
+                    current_case_counts[form_doubling_time_colname(day_idx)],
+                    r"{:.3g}d".format,
+                    na_rep="NA",
                 )
             )
 
     if include_mortality:
         legend_fields.append(CaseTypes.MORTALITY)
         case_count_str_cols.append(
-            current_case_counts[CaseTypes.MORTALITY].map(r"{0:.2%}".format)
+            _format_series(current_case_counts[CaseTypes.MORTALITY], r"{0:.2%}".format)
         )
 
     # Add case counts of the different categories to the legend (next few blocks)
@@ -371,12 +520,13 @@ def _format_legend(
         f"{location_heading}{left_str}{fmt_str}{right_str}"
     )
 
-    labels = (
-        current_case_counts[Columns.LOCATION_NAME]
-        + left_str
-        + case_count_str_cols[0].str.cat(case_count_str_cols[1:], sep=sep_str)
-        + right_str
-    )
+    labels = [
+        f"{location_name}{left_str}{sep_str.join(row)}{right_str}"
+        for location_name, *row in zip(
+            current_case_counts[Columns.LOCATION_NAME].to_numpy(),
+            *(col.to_numpy() for col in case_count_str_cols),
+        )
+    ]
 
     #  First label is title, so skip it
     for text, label in zip(itertools.islice(legend.texts, 1, None), labels):
@@ -427,16 +577,18 @@ def _plot_helper(
     Counting.verify(count)
     Columns.XAxis.verify(x_axis)
 
-    SORTED_POSITION = "Sorted_Position_"
-
     figs_and_axes = []
 
     if plot_size is None:
         plot_size = (10, 12)
 
-    fig, ax = plt.subplots(figsize=(8, 8), dpi=200, facecolor="white")
-    fig: plt.Figure
-    ax: plt.Axes
+    # Create the figure directly rather than through pyplot, so that it isn't tracked
+    # (and kept alive) by pyplot's figure manager after we're done with it. Create it
+    # at the dpi it's saved at, so saving doesn't have to switch dpis and lay
+    # everything out again.
+    fig = Figure(figsize=(8, 8), dpi=300, facecolor="white")
+    FigureCanvasAgg(fig)
+    ax: plt.Axes = fig.subplots()
 
     if stage is Select.ALL:
         current_case_counts = get_current_case_data(
@@ -447,34 +599,50 @@ def _plot_helper(
             df, stage=stage, count=count, x_axis=x_axis
         )
 
-    df = df[
-        df[Columns.CASE_TYPE].isin(
-            CaseInfo.get_info_items_for(
-                InfoField.CASE_TYPE, stage=stage, count=count
-            ).values
+    case_types = df[Columns.CASE_TYPE]
+    allowed_case_types = CaseInfo.get_info_items_for(
+        InfoField.CASE_TYPE, stage=stage, count=count
+    ).values
+    if isinstance(case_types.dtype, pd.CategoricalDtype):
+        # Only check the (few) categories against the allowed case types; rows are
+        # then selected by comparing their integer codes
+        allowed_codes = np.flatnonzero(
+            case_types.cat.categories.isin(allowed_case_types)
         )
-    ]
+        df = df[np.isin(case_types.cat.codes.to_numpy(), allowed_codes)]
+    else:
+        df = df[case_types.isin(allowed_case_types)]
 
     # Filter and sort color mapping correctly so that colors 1. are assigned to the
     # same locations across graphs (for continuity) and 2. are placed correctly in the
     # legend (for correctness)
-    color_mapping = color_mapping.copy()
-    color_mapping = color_mapping[
-        color_mapping[Columns.LOCATION_NAME].isin(
-            current_case_counts[Columns.LOCATION_NAME]
+    # Look up each location's position in a dict rather than with list.index, which
+    # would make this quadratic in the number of locations. (Iterate in reverse so that,
+    # as with list.index, a location's first position is the one kept.)
+    location_positions = {
+        location: i
+        for i, location in reversed(
+            list(enumerate(current_case_counts[Columns.LOCATION_NAME].to_numpy()))
         )
+    }
+    # The same lookup does the filtering: locations without a position aren't in
+    # current_case_counts
+    positions = color_mapping[Columns.LOCATION_NAME].map(location_positions)
+    has_position = positions.notna().to_numpy()
+    color_mapping = color_mapping[has_position].iloc[
+        np.argsort(positions[has_position].to_numpy(), kind="stable")
     ]
-    color_mapping[SORTED_POSITION] = color_mapping[Columns.LOCATION_NAME].map(
-        current_case_counts[Columns.LOCATION_NAME].tolist().index
-    )
-    color_mapping = color_mapping.sort_values(SORTED_POSITION)
 
     config_df = CaseInfo.get_info_items_for(
         InfoField.CASE_TYPE, InfoField.DASH_STYLE, stage=stage, count=count
     )
 
     with plt.style.context(style or "default"):
+        # There's exactly one point per (location, case type, x), so there's nothing
+        # to aggregate; estimator=None skips seaborn's per-x groupby (and confidence
+        # intervals) and just draws each line from its points
         g = sns.lineplot(
+            ax=ax,
             data=df,
             x=x_axis.column(),
             y=Columns.CASE_COUNT,
@@ -484,6 +652,7 @@ def _plot_helper(
             style_order=config_df[InfoField.CASE_TYPE].tolist(),
             dashes=config_df[InfoField.DASH_STYLE].tolist(),
             palette=color_mapping[COLOR].tolist(),
+            estimator=None,
         )
 
         default_stage = stage
@@ -542,8 +711,7 @@ def _plot_helper(
             count.raise_for_unhandled_case()
 
         # Configure plot design
-        now_str = datetime.now(timezone.utc).strftime(r"%b %-d, %Y at %H:%M UTC")
-        ax.set_title(f"Last updated {now_str}", loc="right", fontsize="small")
+        ax.set_title(f"Last updated {RUN_TIMESTAMP}", loc="right", fontsize="small")
 
         for line in g.lines:
             line.set_linewidth(2)
@@ -570,7 +738,7 @@ def _plot_helper(
         # Save
         savefile_path = Paths.FIGURES / savefile_path
         savefile_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(savefile_path, bbox_inches="tight", dpi=300)
+        fig.savefig(savefile_path, bbox_inches="tight", dpi="figure")
         print(f"Saved '{savefile_path.relative_to(Paths.ROOT)}'")
 
         figs_and_axes.append((fig, ax))
@@ -629,12 +797,25 @@ def plot(
     else:
         x_axis.raise_for_unhandled_case()
 
+    # There are only a handful of case types, so as a categorical the column is stored
+    # (and filtered, in _plot_helper) as small integer codes rather than strings
+    df = df.assign(**{Columns.CASE_TYPE: df[Columns.CASE_TYPE].astype("category")})
+
     savefile_path, location_heading = get_savefile_path_and_location_heading(
         df, x_axis=x_axis, stage=stage, count=count
     )
 
     if df_with_china is not None:
-        color_mapping = get_color_palette_assignments(df_with_china)
+        # The same reference frame is passed to several calls to plot()
+        cached = _COLOR_MAPPING_CACHE.get(id(df_with_china))
+        if cached is not None and cached[0] is df_with_china:
+            color_mapping = cached[1]
+        else:
+            color_mapping = get_color_palette_assignments(df_with_china)
+            _COLOR_MAPPING_CACHE.pop(id(df_with_china), None)
+            while len(_COLOR_MAPPING_CACHE) >= _COLOR_MAPPING_CACHE_MAXSIZE:
+                del _COLOR_MAPPING_CACHE[next(iter(_COLOR_MAPPING_CACHE))]
+            _COLOR_MAPPING_CACHE[id(df_with_china)] = (df_with_china, color_mapping)
     else:
         color_mapping = get_color_palette_assignments(df)
 
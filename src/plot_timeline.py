@@ -1,17 +1,22 @@
 # %%
+import concurrent.futures
 import functools
 import itertools
+import multiprocessing
+import os
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, List, Union
 
 import cmocean
 import geopandas
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from IPython.display import display  # noqa F401
+from matplotlib.collections import LineCollection
 from matplotlib.colors import LogNorm
 from matplotlib.ticker import NullFormatter, NullLocator
 from mpl_toolkits.axes_grid1 import axes_size, make_axes_locatable
@@ -20,18 +25,44 @@ from typing_extensions import Literal
 from constants import USA_STATE_CODES, Columns, Counting, DiseaseStage, Paths, Select
 from plotting_utils import format_float, resize_to_even_dims
 
+matplotlib.use("agg")
 
 GEO_FIG_DIR: Path = Paths.FIGURES / "Geo"
 DOD_DIFF_DIR: Path = GEO_FIG_DIR / "DayOverDayDiffs"
 DOD_DIFF_DIR.mkdir(parents=True, exist_ok=True)
 
+USA_STATES_SHAPEFILE: Path = (
+    Paths.DATA / "Geo" / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
+)
+GEO_DF_CACHE_FILE: Path = USA_STATES_SHAPEFILE.with_name(
+    "cb_2017_us_state_20m_epsg2163.pkl"
+)
+
 
 def get_geo_df() -> geopandas.GeoDataFrame:
-    return geopandas.read_file(
-        Paths.DATA / "Geo" / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
-    ).to_crs(
+    # Shallow copy so that callers can't modify the cached frame itself
+    return _read_geo_df().copy(deep=False)
+
+
+@functools.lru_cache(None)
+def _read_geo_df() -> geopandas.GeoDataFrame:
+    # Reading the shapefile and reprojecting it is slow, and its result never changes,
+    # so it's saved and reused until the shapefile (or this file) is modified
+    if GEO_DF_CACHE_FILE.exists() and GEO_DF_CACHE_FILE.stat().st_mtime > max(
+        p.stat().st_mtime for p in [USA_STATES_SHAPEFILE, Path(__file__)]
+    ):
+        try:
+            return pd.read_pickle(GEO_DF_CACHE_FILE)
+        except Exception:
+            # A pickle written under a different version of geopandas or shapely may
+            # not load under this one; just rebuild it
+            pass
+
+    geo_df = geopandas.read_file(USA_STATES_SHAPEFILE).to_crs(
         "EPSG:2163"  # Google this magic string
     )
+    geo_df.to_pickle(GEO_DF_CACHE_FILE)
+    return geo_df
     # return geopandas.read_file(
     #     Paths.DATA / "Geo" / "cb_2018_us_state_5m" / "cb_2018_us_state_5m.shp"
     # ).to_crs(
@@ -39,6 +70,229 @@ def get_geo_df() -> geopandas.GeoDataFrame:
     # )
 
 
+def _render_frames(
+    dates: List[pd.Timestamp],
+    *,
+    frame_diffs: pd.DataFrame,
+    plot_geo_df: geopandas.GeoDataFrame,
+    stage_list: List[DiseaseStage],
+    count_list: List[Counting],
+    vmins: Dict[Counting, float],
+    vmaxs: pd.Series,
+    max_date: pd.Timestamp,
+    now_str: str,
+):
+    """Render and save the day-over-day diff frames for the given dates
+
+    Module-level so that it can be run in a worker process
+
+    :param dates: The dates whose frames to render, in the order to render them
+    :type dates: List[pd.Timestamp]
+    :param frame_diffs: The diffs, with one row per (stage, count type, date) and one
+    column per row of `plot_geo_df`
+    :type frame_diffs: pd.DataFrame
+    :param plot_geo_df: The states to plot, one polygon per row
+    :type plot_geo_df: geopandas.GeoDataFrame
+    :param stage_list: The stages to plot, one row of subplots each
+    :type stage_list: List[DiseaseStage]
+    :param count_list: The count types to plot, one column of subplots each
+    :type count_list: List[Counting]
+    :param vmins: The color scales' lower limits, by count type
+    :type vmins: Dict[Counting, float]
+    :param vmaxs: The color scales' upper limits, indexed by (stage, count type) names
+    :type vmaxs: pd.Series
+    :param max_date: The latest date overall, whose frame is also saved as the poster
+    :type max_date: pd.Timestamp
+    :param now_str: The time to show as when the frames were last updated
+    :type now_str: str
+    """
+
+    ASPECT_RATIO = 1 / 20
+    PAD_FRAC = 0.5
+    N_CBAR_BUCKETS = 6  # only used when bucketing colormap into discrete regions
+    N_BUCKETS_BTWN_MAJOR_TICKS = 1
+    N_MINOR_TICKS_BTWN_MAJOR_TICKS = 8  # major_1, minor_1, ..., minor_n, major_2
+    N_CBAR_MAJOR_TICKS = N_CBAR_BUCKETS // N_BUCKETS_BTWN_MAJOR_TICKS + 1
+    CMAP = cmocean.cm.matter
+    # CMAP = ListedColormap(cmocean.cm.matter(np.linspace(0, 1, N_CBAR_BUCKETS)))
+    DPI = 300
+
+    # The saved PNG is immediately reopened, padded, and resaved by
+    # resize_to_even_dims, so there's no point in compressing it well
+    save_fig_kwargs = {
+        "dpi": "figure",
+        "bbox_inches": "tight",
+        "facecolor": "w",
+        "pil_kwargs": {"compress_level": 1},
+    }
+
+    fig: plt.Figure = plt.figure(facecolor="white", dpi=DPI)
+
+    # Don't put too much stock in these, we tweak them later to make sure they're even
+    fig_width_px = len(count_list) * 1800
+    fig_height_px = len(stage_list) * 1000 + 200
+    fig.set_size_inches(fig_width_px / DPI, fig_height_px / DPI)
+
+    # The states' boundaries (the polygons' rings) are the same in every subplot
+    boundary_segments = [
+        np.asarray(ring.coords)[:, :2]
+        for polygon in plot_geo_df.geometry
+        for ring in [polygon.exterior, *polygon.interiors]
+    ]
+
+    # Everything except the states' colors (and the figure title) is the same in every
+    # frame, so set each subplot up once and only recolor the states per date. Each
+    # subplot's colors for the i-th date are row frame_rows[i] of frame_diff_values.
+    frame_diff_values = frame_diffs.to_numpy()
+    state_collections = []
+    for subplot_index, (stage, count) in enumerate(
+        itertools.product(stage_list, count_list), start=1
+    ):
+        ax: plt.Axes = fig.add_subplot(len(stage_list), len(count_list), subplot_index)
+
+        # Add timestamp to top right axis
+        if subplot_index == 2:
+            ax.text(
+                1.25,  # Coords are arbitrary magic numbers
+                1.23,
+                f"Last updated {now_str}",
+                horizontalalignment="right",
+                fontsize="small",
+                transform=ax.transAxes,
+            )
+
+        vmin = vmins[count]
+        vmax = vmaxs.loc[(stage.name, count.name)]
+
+        # Create log-scaled color mapping
+        # https://stackoverflow.com/a/43807666
+        norm = LogNorm(vmin, vmax)
+        scm = plt.cm.ScalarMappable(norm=norm, cmap=CMAP)
+
+        # Actually plot the states; their colors are set per date below. Omit legend,
+        # since we'll want to customize it and it's easier to create a new one than
+        # customize the existing one.
+        plot_geo_df.plot(
+            column=np.full(len(plot_geo_df), vmin),
+            ax=ax,
+            legend=False,
+            vmin=vmin,
+            vmax=vmax,
+            cmap=CMAP,
+            norm=norm,
+        )
+        frame_rows = frame_diffs.index.get_indexer(
+            pd.MultiIndex.from_product([[stage.name], [count.name], dates])
+        )
+        state_collections.append((ax.collections[-1], frame_rows))
+
+        # Plot state boundaries
+        ax.add_collection(
+            LineCollection(boundary_segments, linewidths=0.06, edgecolors="k"),
+            autolim=False,
+        )
+
+        # Add colorbar axes to right side of graph
+        # https://stackoverflow.com/a/33505522
+        divider = make_axes_locatable(ax)
+        width = axes_size.AxesY(ax, aspect=ASPECT_RATIO)
+        pad = axes_size.Fraction(PAD_FRAC, width)
+        cax = divider.append_axes("right", size=width, pad=pad)
+
+        # Add colorbar itself
+        cbar = fig.colorbar(scm, cax=cax)
+
+        # Add evenly spaced ticks and their labels
+        # First major, then minor
+        # Adapted from https://stackoverflow.com/a/50314773
+        bucket_size = (vmax / vmin) ** (1 / N_CBAR_BUCKETS)
+        tick_dist = bucket_size ** N_BUCKETS_BTWN_MAJOR_TICKS
+
+        # Simple log scale math
+        major_tick_locs = (
+            vmin
+            * (tick_dist ** np.arange(0, N_CBAR_MAJOR_TICKS))
+            # * (bucket_size ** 0.5) # Use this if centering ticks on buckets
+        )
+
+        cbar.set_ticks(major_tick_locs)
+
+        # Get minor locs by linearly interpolating between each pair of consecutive
+        # major ticks, excluding the major ticks themselves
+        minor_tick_fracs = np.linspace(0, 1, N_MINOR_TICKS_BTWN_MAJOR_TICKS + 2)[1:-1]
+        minor_tick_locs = (
+            major_tick_locs[:-1, np.newaxis] * (1 - minor_tick_fracs)
+            + major_tick_locs[1:, np.newaxis] * minor_tick_fracs
+        ).ravel()
+
+        cbar.ax.yaxis.set_ticks(minor_tick_locs, minor=True)
+        cbar.ax.yaxis.set_minor_formatter(NullFormatter())
+
+        # Add major tick labels
+        if count is Counting.PER_CAPITA:
+            fmt_func = "{:.2e}".format
+        else:
+            fmt_func = functools.partial(format_float, max_digits=5, decimal_penalty=2)
+
+        cbar.set_ticklabels([fmt_func(x) if x != 0 else "0" for x in major_tick_locs])
+
+        # Set axes titles
+        ax_stage_name: str = {
+            DiseaseStage.CONFIRMED: "Cases",
+            DiseaseStage.DEATH: "Deaths",
+        }[stage]
+        ax_title_components: List[str] = ["New Daily", ax_stage_name]
+        if count is Counting.PER_CAPITA:
+            ax_title_components.append("Per Capita")
+
+        ax.set_title(" ".join(ax_title_components))
+
+        # Remove axis ticks (I think they're lat/long but we don't need them)
+        for spine in [ax.xaxis, ax.yaxis]:
+            spine.set_major_locator(NullLocator())
+            spine.set_minor_locator(NullLocator())
+
+    # The title is the only text that changes from frame to frame (the tick labels,
+    # axes titles, etc. were set once above), so create it once and just update it
+    suptitle = fig.suptitle("")
+
+    for date_index, date in enumerate(dates):
+        date: pd.Timestamp = pd.Timestamp(date)
+        # Data is associated with the right endpoint of the data collection period,
+        # e.g., data collected *on* March 20 is labeled March 21 -- this is done so that
+        # data collected today (on the day the code is run) has a meaningful date
+        # associated with it (today's current time)
+        # Anyway, here we undo that and display data on the date it was collected
+        # in order to show a meaningful title on the graph
+        if date == date.normalize():
+            collection_date = date - pd.Timedelta(days=1)
+        else:
+            collection_date = date.normalize()
+
+        suptitle.set_text(collection_date.strftime(r"%b %-d, %Y"))
+
+        # Recolor the states with each axes' data: its stage, its count-type, this date
+        for collection, frame_rows in state_collections:
+            collection.set_array(frame_diff_values[frame_rows[date_index]])
+
+        # Save figure, and then deal with matplotlib weirdness that doesn't exactly
+        # respect the dimensions we set due to bbox_inches='tight'
+        save_path: Path = DOD_DIFF_DIR / f"dod_diff_{date.strftime(r'%Y%m%d')}.png"
+        fig.savefig(save_path, **save_fig_kwargs)
+
+        # x264 video encoder requires frames have even width and height
+        resize_to_even_dims(save_path)
+
+        # Save poster (preview frame for video on web)
+        if date == max_date:
+            (GEO_FIG_DIR / "dod_diff_poster.png").write_bytes(save_path.read_bytes())
+
+        print(f"Saved '{save_path}'")
+
+        # if date < pd.Timestamp("2020-4-16"):
+        #     break
+
+
 def plot_usa_daybyday_case_diffs(
     states_df: pd.DataFrame,
     *,
@@ -46,6 +300,7 @@ def plot_usa_daybyday_case_diffs(
     stage: Union[DiseaseStage, Literal[Select.ALL]],
     count: Union[Counting, Literal[Select.ALL]],
     dates: List[pd.Timestamp] = None,
+    n_workers: int = None,
 ) -> pd.DataFrame:
 
     Counting.verify(count, allow_select=True)
@@ -55,15 +310,6 @@ def plot_usa_daybyday_case_diffs(
         geo_df = get_geo_df()
 
     DIFF_COL = "Diff_"
-    ASPECT_RATIO = 1 / 20
-    PAD_FRAC = 0.5
-    N_CBAR_BUCKETS = 6  # only used when bucketing colormap into discrete regions
-    N_BUCKETS_BTWN_MAJOR_TICKS = 1
-    N_MINOR_TICKS_BTWN_MAJOR_TICKS = 8  # major_1, minor_1, ..., minor_n, major_2
-    N_CBAR_MAJOR_TICKS = N_CBAR_BUCKETS // N_BUCKETS_BTWN_MAJOR_TICKS + 1
-    CMAP = cmocean.cm.matter
-    # CMAP = ListedColormap(cmocean.cm.matter(np.linspace(0, 1, N_CBAR_BUCKETS)))
-    DPI = 300
     NOW_STR = datetime.now(timezone.utc).strftime(r"%b %-d, %Y at %H:%M UTC")
 
     ID_COLS = [
@@ -73,8 +319,6 @@ def plot_usa_daybyday_case_diffs(
         Columns.COUNT_TYPE,
     ]
 
-    save_fig_kwargs = {"dpi": "figure", "bbox_inches": "tight", "facecolor": "w"}
-
     if count is Select.ALL:
         count_list = list(Counting)
     else:
@@ -91,41 +335,51 @@ def plot_usa_daybyday_case_diffs(
     if dates is None:
         dates: List[pd.Timestamp] = states_df[Columns.DATE].unique()
 
-    dates = sorted(pd.Timestamp(date) for date in dates)
+    dates = np.sort(pd.to_datetime(dates).to_numpy())
 
     # Get day-by-day case diffs per location, date, stage, count-type
     case_diffs_df = states_df[
         (states_df[Columns.TWO_LETTER_STATE_CODE].isin(USA_STATE_CODES))
         & (~states_df[Columns.TWO_LETTER_STATE_CODE].isin(["AK", "HI"]))
-    ].copy()
+    ]
 
     # Make sure data exists for every date for every state so that the entire country is
     # plotted each day; fill missing data with 0 (missing really *is* as good as 0)
+    # Each level's values are sorted so that the rows come out sorted by ID_COLS
     state_date_stage_combos = pd.MultiIndex.from_product(
         [
-            case_diffs_df[Columns.TWO_LETTER_STATE_CODE].unique(),
+            np.sort(case_diffs_df[Columns.TWO_LETTER_STATE_CODE].unique()),
             dates,
-            [s.name for s in DiseaseStage],
-            [c.name for c in Counting],
+            sorted(s.name for s in DiseaseStage),
+            sorted(c.name for c in Counting),
         ],
         names=ID_COLS,
     )
 
     case_diffs_df = (
-        state_date_stage_combos.to_frame(index=False)
-        .merge(case_diffs_df, how="left", on=ID_COLS,)
-        .sort_values(ID_COLS)
+        case_diffs_df.set_index(ID_COLS).reindex(state_date_stage_combos).reset_index()
     )
 
     case_diffs_df[Columns.CASE_COUNT] = case_diffs_df[Columns.CASE_COUNT].fillna(0)
 
-    case_diffs_df[DIFF_COL] = case_diffs_df.groupby(
-        [Columns.TWO_LETTER_STATE_CODE, Columns.STAGE, Columns.COUNT_TYPE]
-    )[Columns.CASE_COUNT].diff()
+    # Diff each (state, stage, count type)'s case counts from one date to the next. The
+    # rows are the full grid in ID_COLS order, so as a (state, date, stage x count type)
+    # array, that's just a diff along the date axis; the first date has nothing to diff
+    # against
+    n_states = state_date_stage_combos.levshape[0]
+    case_counts = case_diffs_df[Columns.CASE_COUNT].to_numpy(dtype=float)
+    case_counts = case_counts.reshape(n_states, len(dates), -1)
+
+    diffs = np.full(case_counts.shape, np.nan)
+    diffs[:, 1:] = np.diff(case_counts, axis=1)
+    case_diffs_df[DIFF_COL] = diffs.ravel()
 
     case_diffs_df = case_diffs_df[case_diffs_df[DIFF_COL].notna()]
 
-    dates = case_diffs_df[Columns.DATE].unique()
+    # Only the first date has no diff
+    dates = dates[1:]
+    if len(dates) == 0:
+        return case_diffs_df
 
     vmins = {
         Counting.TOTAL_CASES: 1,
@@ -135,200 +389,117 @@ def plot_usa_daybyday_case_diffs(
     }
     vmaxs = case_diffs_df.groupby([Columns.STAGE, Columns.COUNT_TYPE])[DIFF_COL].max()
 
-    fig: plt.Figure = plt.figure(facecolor="white", dpi=DPI)
-
-    # Don't put too much stock in these, we tweak them later to make sure they're even
-    fig_width_px = len(count_list) * 1800
-    fig_height_px = len(stage_list) * 1000 + 200
-
     max_date = max(dates)
 
-    # The order doesn't matter, but doing later dates first lets us see interesting
-    # output in Finder earlier, which is good for debugging
-    for date in reversed(dates):
-        date: pd.Timestamp = pd.Timestamp(date)
-        # Data is associated with the right endpoint of the data collection period,
-        # e.g., data collected *on* March 20 is labeled March 21 -- this is done so that
-        # data collected today (on the day the code is run) has a meaningful date
-        # associated with it (today's current time)
-        # Anyway, here we undo that and display data on the date it was collected
-        # in order to show a meaningful title on the graph
-        if date == date.normalize():
-            collection_date = date - pd.Timedelta(days=1)
-        else:
-            collection_date = date.normalize()
+    # Should have length 49 (50 + DC - AK - HI)
+    plot_geo_df: geopandas.GeoDataFrame = geo_df[
+        geo_df["STUSPS"].isin(case_diffs_df[Columns.TWO_LETTER_STATE_CODE].unique())
+    ]
+    assert len(plot_geo_df) == 49
 
-        fig.suptitle(collection_date.strftime(r"%b %-d, %Y"))
+    # Each subplot's map is ~1500px across ~4600km, so vertices closer together than
+    # 1km (a third of a pixel) can't be seen but still have to be drawn every frame
+    plot_geo_df = plot_geo_df.assign(
+        geometry=plot_geo_df.geometry.simplify(1_000, preserve_topology=True)
+    )
 
-        for subplot_index, (stage, count) in enumerate(
-            itertools.product(stage_list, count_list), start=1
-        ):
-            ax: plt.Axes = fig.add_subplot(
-                len(stage_list), len(count_list), subplot_index
+    # Split multi-part states into one row per part so that rows correspond one-to-one
+    # with the patches geopandas draws, which lets us recolor them directly
+    polygons_by_state = [
+        list(getattr(geom, "geoms", [geom])) for geom in plot_geo_df.geometry
+    ]
+    plot_geo_df = geopandas.GeoDataFrame(
+        {
+            "STUSPS": np.repeat(
+                plot_geo_df["STUSPS"].to_numpy(), [len(p) for p in polygons_by_state]
             )
+        },
+        geometry=list(itertools.chain.from_iterable(polygons_by_state)),
+        crs=plot_geo_df.crs,
+    )
 
-            # Add timestamp to top right axis
-            if subplot_index == 2:
-                ax.text(
-                    1.25,  # Coords are arbitrary magic numbers
-                    1.23,
-                    f"Last updated {NOW_STR}",
-                    horizontalalignment="right",
-                    fontsize="small",
-                    transform=ax.transAxes,
-                )
-
-            # Filter to just this axes: this stage, this count-type, this date
-            stage_date_df = case_diffs_df[
-                (case_diffs_df[Columns.STAGE] == stage.name)
-                & (case_diffs_df[Columns.COUNT_TYPE] == count.name)
-                & (case_diffs_df[Columns.DATE] == date)
+    # Line up all the diffs with the plotted states in one go, with one row per frame
+    # (stage, count type, date) and one column per row of plot_geo_df, so that each
+    # frame's data is a single lookup rather than a filter and join
+    frame_diffs: pd.DataFrame = (
+        case_diffs_df.set_index(
+            [
+                Columns.STAGE,
+                Columns.COUNT_TYPE,
+                Columns.DATE,
+                Columns.TWO_LETTER_STATE_CODE,
             ]
+        )[DIFF_COL]
+        .unstack(Columns.TWO_LETTER_STATE_CODE)
+        .reindex(columns=plot_geo_df["STUSPS"])
+    )
 
-            # Should have length 49 (50 + DC - AK - HI)
-            stage_geo_df: geopandas.GeoDataFrame = geo_df.merge(
-                stage_date_df,
-                how="inner",
-                left_on="STUSPS",
-                right_on=Columns.TWO_LETTER_STATE_CODE,
-            )
-            assert len(stage_geo_df) == 49
-
-            vmin = vmins[count]
-            vmax = vmaxs.loc[(stage.name, count.name)]
-
-            # Create log-scaled color mapping
-            # https://stackoverflow.com/a/43807666
-            norm = LogNorm(vmin, vmax)
-            scm = plt.cm.ScalarMappable(norm=norm, cmap=CMAP)
-
-            # Actually plot the data. Omit legend, since we'll want to customize it and
-            # it's easier to create a new one than customize the existing one.
-            stage_geo_df.plot(
-                column=DIFF_COL,
-                ax=ax,
-                legend=False,
-                vmin=vmin,
-                vmax=vmax,
-                cmap=CMAP,
-                norm=norm,
-            )
-
-            # Plot state boundaries
-            stage_geo_df.boundary.plot(ax=ax, linewidth=0.06, edgecolor="k")
-
-            # Add colorbar axes to right side of graph
-            # https://stackoverflow.com/a/33505522
-            divider = make_axes_locatable(ax)
-            width = axes_size.AxesY(ax, aspect=ASPECT_RATIO)
-            pad = axes_size.Fraction(PAD_FRAC, width)
-            cax = divider.append_axes("right", size=width, pad=pad)
-
-            # Add colorbar itself
-            cbar = fig.colorbar(scm, cax=cax)
-
-            # Add evenly spaced ticks and their labels
-            # First major, then minor
-            # Adapted from https://stackoverflow.com/a/50314773
-            bucket_size = (vmax / vmin) ** (1 / N_CBAR_BUCKETS)
-            tick_dist = bucket_size ** N_BUCKETS_BTWN_MAJOR_TICKS
-
-            # Simple log scale math
-            major_tick_locs = (
-                vmin
-                * (tick_dist ** np.arange(0, N_CBAR_MAJOR_TICKS))
-                # * (bucket_size ** 0.5) # Use this if centering ticks on buckets
-            )
-
-            cbar.set_ticks(major_tick_locs)
-
-            # Get minor locs by linearly interpolating between major ticks
-            minor_tick_locs = []
-            for major_tick_index, this_major_tick in enumerate(major_tick_locs[:-1]):
-                next_major_tick = major_tick_locs[major_tick_index + 1]
-
-                # Get minor ticks as numbers in range [this_major_tick, next_major_tick]
-                # and exclude the major ticks themselves (once we've used them to
-                # compute the minor tick locs)
-                minor_tick_locs.extend(
-                    np.linspace(
-                        this_major_tick,
-                        next_major_tick,
-                        N_MINOR_TICKS_BTWN_MAJOR_TICKS + 2,
-                    )[1:-1]
-                )
-
-            cbar.ax.yaxis.set_ticks(minor_tick_locs, minor=True)
-            cbar.ax.yaxis.set_minor_formatter(NullFormatter())
+    # The frames are independent of one another, so they can be rendered in parallel,
+    # with each worker setting up its own figure once; n_workers defaults to one per
+    # CPU. The order doesn't matter, but doing later dates first lets us see interesting
+    # output in Finder earlier, which is good for debugging, so each worker gets every
+    # n-th date starting from the latest
+    dates = sorted(dates, reverse=True)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(dates))
+
+    render_kwargs = {
+        "plot_geo_df": plot_geo_df,
+        "stage_list": stage_list,
+        "count_list": count_list,
+        "vmins": vmins,
+        "vmaxs": vmaxs,
+        "max_date": max_date,
+        "now_str": NOW_STR,
+    }
 
-            # Add major tick labels
-            if count is Counting.PER_CAPITA:
-                fmt_func = "{:.2e}".format
-            else:
-                fmt_func = functools.partial(
-                    format_float, max_digits=5, decimal_penalty=2
+    if n_workers <= 1:
+        # Rendering here avoids starting a worker, which would have to import everything
+        # anew
+        _render_frames(dates, frame_diffs=frame_diffs, **render_kwargs)
+        return case_diffs_df
+
+    with concurrent.futures.ProcessPoolExecutor(
+        n_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = []
+        for worker_index in range(n_workers):
+            worker_dates = dates[worker_index::n_workers]
+            futures.append(
+                executor.submit(
+                    _render_frames,
+                    worker_dates,
+                    frame_diffs=frame_diffs[
+                        frame_diffs.index.get_level_values(Columns.DATE).isin(
+                            worker_dates
+                        )
+                    ],
+                    **render_kwargs,
                 )
-
-            cbar.set_ticklabels(
-                [fmt_func(x) if x != 0 else "0" for x in major_tick_locs]
             )
 
-            # Set axes titles
-            ax_stage_name: str = {
-                DiseaseStage.CONFIRMED: "Cases",
-                DiseaseStage.DEATH: "Deaths",
-            }[stage]
-            ax_title_components: List[str] = ["New Daily", ax_stage_name]
-            if count is Counting.PER_CAPITA:
-                ax_title_components.append("Per Capita")
-
-            ax.set_title(" ".join(ax_title_components))
-
-            # Remove axis ticks (I think they're lat/long but we don't need them)
-            for spine in [ax.xaxis, ax.yaxis]:
-                spine.set_major_locator(NullLocator())
-                spine.set_minor_locator(NullLocator())
-
-        # Save figure, and then deal with matplotlib weirdness that doesn't exactly
-        # respect the dimensions we set due to bbox_inches='tight'
-        save_path: Path = DOD_DIFF_DIR / f"dod_diff_{date.strftime(r'%Y%m%d')}.png"
-        fig.set_size_inches(fig_width_px / DPI, fig_height_px / DPI)
-        fig.savefig(save_path, **save_fig_kwargs)
-
-        # x264 video encoder requires frames have even width and height
-        resize_to_even_dims(save_path)
-
-        # Save poster (preview frame for video on web)
-        if date == max_date:
-            (GEO_FIG_DIR / "dod_diff_poster.png").write_bytes(save_path.read_bytes())
-
-        fig.clf()
-
-        print(f"Saved '{save_path}'")
-
-        # if date < pd.Timestamp("2020-4-16"):
-        #     break
+        for future in futures:
+            future.result()
 
     return case_diffs_df
 
 
 def make_video(fps: float):
     img_files = sorted(DOD_DIFF_DIR.glob("*.png"))
-    concat_demux_lines = []
 
     # https://trac.ffmpeg.org/wiki/Slideshow
-    for f in img_files:
-        concat_demux_lines.append(f"file '{f}'")
-        concat_demux_lines.append(f"duration {1/fps}")
-
     # Duplicate last frame 2x so that it's clear when video has ended
-    for _ in range(2):
-        concat_demux_lines.append(f"file '{img_files[-1]}'")
-        concat_demux_lines.append(f"duration {1/fps}")
-
-    concat_demux_lines.append(f"file '{img_files[-1]}'")
-
-    concat_demux_str = "\n".join(concat_demux_lines)
+    frame_duration = f"duration {1/fps}"
+    concat_demux_str = "\n".join(
+        [
+            *(
+                f"file '{f}'\n{frame_duration}"
+                for f in [*img_files, img_files[-1], img_files[-1]]
+            ),
+            f"file '{img_files[-1]}'",
+        ]
+    )
 
     save_path = GEO_FIG_DIR / "dod_diffs.mp4"
 
@@ -6,7 +6,7 @@ import re
 import subprocess
 import uuid
 from pathlib import Path
-from typing import Callable, List, NewType, Tuple, Union
+from typing import Callable, List, NewType, Optional, Tuple, Union
 
 import bokeh.plotting as bplotting
 import cmocean
@@ -42,7 +42,6 @@ from bokeh.models.formatters import NumeralTickFormatter, PrintfTickFormatter
 from bokeh.models.tickers import FixedTicker
 from bokeh.resources import CDN
 from IPython.display import display  # noqa F401
-from shapely.geometry import mapping as shapely_mapping
 from typing_extensions import Literal
 
 from constants import USA_STATE_CODES, Columns, Counting, DiseaseStage, Paths, Select
@@ -53,8 +52,6 @@ GEO_FIG_DIR: Path = Paths.FIGURES / "Geo"
 PNG_SAVE_ROOT_DIR: Path = GEO_FIG_DIR / "BokehInteractiveStatic"
 PNG_SAVE_ROOT_DIR.mkdir(parents=True, exist_ok=True)
 
-Polygon = NewType("Polygon", List[Tuple[float, float]])
-MultiPolygon = NewType("MultiPolygon", List[Tuple[Polygon]])
 DateString = NewType("DateString", str)
 BokehColor = NewType("BokehColor", str)
 InfoForAutoload = NewType("InfoForAutoload", Tuple[str, str])
@@ -135,27 +132,17 @@ def get_longs_lats(geo_df: geopandas.GeoDataFrame) -> geopandas.GeoDataFrame:
     for multipoly in geo_df.geometry:
         multipoly_vertex_longs = []
         multipoly_vertex_lats = []
-        # Shapely Polygons are mapped as 1-tuples containing a list of (x,y) 2-tuples
-        # representing the vertices
-        # MultiPolygons are lists thereof
-        # I don't know why they use 1-tuples instead of just tup[0], but they do
-        shape_info: dict = shapely_mapping(multipoly)
-        shape_type: str = shape_info["type"]
         # Another option would be Point, but our geo data doesn't have locations
         # like that
-        assert shape_type in ["Polygon", "MultiPolygon"]
+        assert multipoly.geom_type in ["Polygon", "MultiPolygon"]
 
-        polygons = shape_info["coordinates"]
-        if shape_type == "Polygon":
-            # Turn Polygon into 1-list of Polygons
-            polygons = [polygons]
+        # Turn Polygon into 1-list of Polygons
+        polygons = getattr(multipoly, "geoms", [multipoly])
 
-        polygons: MultiPolygon
-
-        for poly_index, poly_tup in enumerate(polygons):
-            # Extract the sole element of the 1-tuple
-            poly: Polygon = poly_tup[0]
-            polygon_vertex_longs, polygon_vertex_lats = zip(*poly)
+        for poly_index, poly in enumerate(polygons):
+            # Only the exterior ring is drawn; `xy` gives its vertices' coordinates as
+            # two flat arrays, without building a tuple per vertex
+            polygon_vertex_longs, polygon_vertex_lats = poly.exterior.xy
 
             multipoly_vertex_longs.extend(polygon_vertex_longs)
             multipoly_vertex_lats.extend(polygon_vertex_lats)
@@ -174,6 +161,35 @@ def get_longs_lats(geo_df: geopandas.GeoDataFrame) -> geopandas.GeoDataFrame:
     return geo_df
 
 
+def _read_geo_df_cache(
+    cache_file: Path, shapefile: Path
+) -> Optional[geopandas.GeoDataFrame]:
+    """Read a processed geo df saved to disk, if it's still valid
+
+    Reading a shapefile, reprojecting it, and extracting the long/lat coords is slow,
+    and its result never changes, so it's saved and reused until the shapefile (or
+    this file) is modified
+
+    :param cache_file: The file the processed geo df was pickled to
+    :type cache_file: Path
+    :param shapefile: The shapefile the geo df was computed from
+    :type shapefile: Path
+    :return: The saved geo df, or None if the cache file is missing, older than its
+    inputs, or can't be loaded (e.g., because it was pickled under a different version
+    of geopandas or shapely)
+    :rtype: Optional[geopandas.GeoDataFrame]
+    """
+    if not cache_file.exists() or cache_file.stat().st_mtime <= max(
+        p.stat().st_mtime for p in [shapefile, Path(__file__)]
+    ):
+        return None
+
+    try:
+        return pd.read_pickle(cache_file)
+    except Exception:
+        return None
+
+
 @functools.lru_cache(None)
 def get_usa_states_geo_df() -> geopandas.GeoDataFrame:
     """Get geometry and long/lat coords for each US state
@@ -183,15 +199,27 @@ def get_usa_states_geo_df() -> geopandas.GeoDataFrame:
     :rtype: geopandas.GeoDataFrame
     """
 
-    geo_df: geopandas.GeoDataFrame = geopandas.read_file(
-        GEO_DATA_DIR / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
-    ).to_crs(
-        "EPSG:2163"  # US National Atlas Equal Area (Google it)
-    ).rename(
-        columns={"STUSPS": REGION_NAME_COL}, errors="raise"
+    shapefile = GEO_DATA_DIR / "cb_2017_us_state_20m" / "cb_2017_us_state_20m.shp"
+    cache_file = shapefile.with_name("cb_2017_us_state_20m_bokeh.pkl")
+    cached_geo_df = _read_geo_df_cache(cache_file, shapefile)
+    if cached_geo_df is not None:
+        return cached_geo_df
+
+    geo_df: geopandas.GeoDataFrame = (
+        geopandas.read_file(shapefile)
+        .to_crs("EPSG:2163")  # US National Atlas Equal Area (Google it)
+        .rename(columns={"STUSPS": REGION_NAME_COL}, errors="raise")
+    )
+
+    # Even fully zoomed in, a pixel spans a couple km; vertices closer together than 1km
+    # can't be seen, but still bloat the embedded JS and have to be drawn
+    geo_df = geo_df.assign(
+        geometry=geo_df.geometry.simplify(1_000, preserve_topology=True)
     )
 
-    return get_longs_lats(geo_df)
+    geo_df = get_longs_lats(geo_df)
+    geo_df.to_pickle(cache_file)
+    return geo_df
 
 
 @functools.lru_cache(None)
@@ -206,35 +234,67 @@ def get_countries_geo_df() -> geopandas.GeoDataFrame:
     :rtype: geopandas.GeoDataFrame
     """
 
-    geo_df: geopandas.GeoDataFrame = geopandas.read_file(
+    shapefile = (
         GEO_DATA_DIR / "ne_110m_admin_0_map_units" / "ne_110m_admin_0_map_units.shp"
-    ).to_crs(WorldCRS.default().value)
+    )
+    cache_file = shapefile.with_name("ne_110m_admin_0_map_units_bokeh.pkl")
+    cached_geo_df = _read_geo_df_cache(cache_file, shapefile)
+    if cached_geo_df is not None:
+        return cached_geo_df
+
+    geo_df: geopandas.GeoDataFrame = geopandas.read_file(shapefile).to_crs(
+        WorldCRS.default().value
+    )
 
     geo_df = geo_df.rename(columns={"ADMIN": REGION_NAME_COL}, errors="raise")
 
     # Keys are what's in the geo df, values are what we want to rename them to
     # Values must match the names in the original data source. If you don't like those
     # names, change them there and then come back and change the values here.
-    geo_df[REGION_NAME_COL] = (
-        geo_df[REGION_NAME_COL]
-        .map(
-            {
-                "Central African Republic": "Central African Rep.",
-                "Democratic Republic of the Congo": "Dem. Rep. Congo",
-                "Equatorial Guinea": "Eq. Guinea",
-                "eSwatini": "Eswatini",
-                "Georgia (Country)": "Georgia (country)",
-                "South Sudan": "S. Sudan",
-                "United Arab Emirates": "UAE",
-                "United Kingdom": "Britain",
-                "Western Sahara": "W. Sahara",
-                "United States of America": "United States",
-            }
-        )
-        .fillna(geo_df[REGION_NAME_COL])
+    geo_df[REGION_NAME_COL] = geo_df[REGION_NAME_COL].replace(
+        {
+            "Central African Republic": "Central African Rep.",
+            "Democratic Republic of the Congo": "Dem. Rep. Congo",
+            "Equatorial Guinea": "Eq. Guinea",
+            "eSwatini": "Eswatini",
+            "Georgia (Country)": "Georgia (country)",
+            "South Sudan": "S. Sudan",
+            "United Arab Emirates": "UAE",
+            "United Kingdom": "Britain",
+            "Western Sahara": "W. Sahara",
+            "United States of America": "United States",
+        }
     )
 
-    return get_longs_lats(geo_df)
+    # As with the US states, drop vertices that are too close together to be seen (the
+    # CRS's units are meters here too)
+    geo_df = geo_df.assign(
+        geometry=geo_df.geometry.simplify(1_000, preserve_topology=True)
+    )
+
+    geo_df = get_longs_lats(geo_df)
+    geo_df.to_pickle(cache_file)
+    return geo_df
+
+
+def _to_value_array(values: pd.Series, is_total_count: pd.Series) -> np.ndarray:
+    """Convert a column of per-date values to the array passed to bokeh
+
+    Per-capita values only need float32's 7 significant digits, which are plenty for a
+    color and a tooltip. But raw counts have to stay exact, and float32 can only hold
+    integers up to 2^24 exactly. Since each column mixes both kinds of rows, a column
+    is only narrowed to float32 if all of its counts are small enough.
+
+    :param values: The column of values
+    :type values: pd.Series
+    :param is_total_count: Whether each row holds a raw count (vs a per-capita value)
+    :type is_total_count: pd.Series
+    :return: The values, as float32 if they fit and float64 otherwise
+    :rtype: np.ndarray
+    """
+    if values[is_total_count].abs().max() <= 2 ** 24:
+        return values.to_numpy(dtype=np.float32)
+    return values.to_numpy(dtype=np.float64)
 
 
 def __make_daybyday_interactive_timeline(
@@ -298,8 +358,9 @@ def __make_daybyday_interactive_timeline(
     :type should_make_video: bool
     :param transform_df_func: This function expects data in a certain format, and does
     a bunch of preprocessing (expected to be common) before plotting. This gives you a
-    chance to do any customization on the postprocessed df before it's plotted. Defaults
-    to None, in which case no additional transformation is performed.
+    chance to do any customization on the postprocessed df before it's plotted. The df
+    it's given is a fresh intermediate, so it may be modified in place. Defaults to
+    None, in which case no additional transformation is performed.
     :type transform_df_func: Callable[[pd.DataFrame], pd.DataFrame], optional
     :param plot_aspect_ratio: The aspect ratio of the plot as width/height; if set, the
     aspect ratio will be fixed to this. Defaults to None, in which case the aspect ratio
@@ -397,46 +458,58 @@ def __make_daybyday_interactive_timeline(
         itertools.product(stage_list, count_list)
     )
 
-    df = df.copy()
-
     # Unadjust dates (see SaveFormats._adjust_dates)
     normalized_dates = df[Columns.DATE].dt.normalize()
     is_at_midnight = df[Columns.DATE] == normalized_dates
-    df.loc[is_at_midnight, Columns.DATE] -= pd.Timedelta(days=1)
-    df.loc[~is_at_midnight, Columns.DATE] = normalized_dates[~is_at_midnight]
+    df = df.assign(
+        **{
+            Columns.DATE: normalized_dates.mask(
+                is_at_midnight, normalized_dates - pd.Timedelta(days=1)
+            )
+        }
+    )
 
     min_date, max_date = df[Columns.DATE].agg(["min", "max"])
-    dates: List[pd.Timestamp] = pd.date_range(start=min_date, end=max_date, freq="D")
+    dates: pd.DatetimeIndex = pd.date_range(start=min_date, end=max_date, freq="D")
     max_date_str = max_date.strftime(DATE_FMT)
 
     # Get day-by-day case diffs per location, date, stage, count-type
 
+    # Only regions we can draw make it into the grid; this also drops rows with no
+    # region, which can't be sorted alongside the names. Some regions (e.g., France)
+    # are split into several shapes in geo_df; filtering (instead of merging) keeps a
+    # single row per (region, date, stage, count)
+    df = df[df[REGION_NAME_COL].isin(geo_df[REGION_NAME_COL])]
+
     # Make sure data exists for every date for every state so that the entire country is
     # plotted each day; fill missing data with 0 (missing really *is* as good as 0)
     # enums will be replaced by their name (kind of important)
+    # Each level's values are sorted so that the rows come out sorted by ID_COLS
     id_cols_product: pd.MultiIndex = pd.MultiIndex.from_product(
         [
-            df[REGION_NAME_COL].unique(),
+            np.sort(df[REGION_NAME_COL].unique()),
             dates,
-            [s.name for s in DiseaseStage],
-            [c.name for c in Counting],
+            sorted(s.name for s in DiseaseStage),
+            sorted(c.name for c in Counting),
         ],
         names=ID_COLS,
     )
 
-    df = (
-        id_cols_product.to_frame(index=False)
-        .merge(df, how="left", on=ID_COLS,)
-        .sort_values(ID_COLS)
-    )
+    # reindex needs unique keys, so (as in the pivot below) any duplicate rows are
+    # combined by taking each column's first non-null value
+    df = df.groupby(ID_COLS).first().reindex(id_cols_product).reset_index()
 
-    df[STRING_DATE_COL] = df[Columns.DATE].dt.strftime(DATE_FMT)
+    # The rows are exactly id_cols_product's, so format each date once and then pick
+    # out each row's date string with the product's date codes
+    df[STRING_DATE_COL] = dates.strftime(DATE_FMT).to_numpy()[
+        id_cols_product.codes[ID_COLS.index(Columns.DATE)]
+    ]
     df[Columns.CASE_COUNT] = df[Columns.CASE_COUNT].fillna(0)
 
     if transform_df_func is not None:
         df = transform_df_func(df)
 
-    df = geo_df.merge(df, how="inner", on=REGION_NAME_COL)[
+    df = df[
         [
             REGION_NAME_COL,
             Columns.DATE,
@@ -447,7 +520,7 @@ def __make_daybyday_interactive_timeline(
         ]
     ]
 
-    dates: List[pd.Timestamp] = [pd.Timestamp(d) for d in df[Columns.DATE].unique()]
+    dates = pd.DatetimeIndex(df[Columns.DATE].unique())
 
     values_mins_maxs = (
         df[df[value_col] > 0]
@@ -474,38 +547,32 @@ def __make_daybyday_interactive_timeline(
     vmins: dict = vmins.to_dict()
     vmaxs: dict = vmaxs.to_dict()
 
+    # All stages' per capita numbers share one denominator
+    if per_capita_denominator is None:
+        _max_pow10 = pow10s_series.loc[(slice(None), Counting.PER_CAPITA.name)].max()
+    else:
+        _max_pow10 = per_capita_denominator
+
     for stage in DiseaseStage:
         _value_key = (stage.name, Counting.PER_CAPITA.name)
-        if per_capita_denominator is None:
-            _max_pow10 = pow10s_series.loc[
-                (slice(None), Counting.PER_CAPITA.name)
-            ].max()
-        else:
-            _max_pow10 = per_capita_denominator
-
         vmins[_value_key] *= _max_pow10
         vmaxs[_value_key] *= _max_pow10
         pow10s_series[_value_key] = _max_pow10
 
-    percap_pow10s: pd.Series = df.apply(
-        lambda row: pow10s_series[(row[Columns.STAGE], row[Columns.COUNT_TYPE])],
-        axis=1,
-    )
-
+    # ...so every per capita row is scaled by the same power of 10
     _per_cap_rows = df[Columns.COUNT_TYPE] == Counting.PER_CAPITA.name
-    df.loc[_per_cap_rows, value_col] *= percap_pow10s.loc[_per_cap_rows]
+    df.loc[_per_cap_rows, value_col] *= _max_pow10
 
     # Ideally we wouldn't have to pivot, and we could do a JIT join of state longs/lats
     # after filtering the data. Unfortunately this is not possible, and a long data
     # format leads to duplication of the very large long/lat lists; pivoting is how we
     # avoid that. (This seems to be one downside of bokeh when compared to plotly)
     df = (
-        df.pivot_table(
-            index=[REGION_NAME_COL, Columns.STAGE, Columns.COUNT_TYPE],
-            columns=STRING_DATE_COL,
-            values=value_col,
-            aggfunc="first",
-        )
+        df.groupby(
+            [REGION_NAME_COL, Columns.STAGE, Columns.COUNT_TYPE, STRING_DATE_COL]
+        )[value_col]
+        .first()
+        .unstack(STRING_DATE_COL)
         .reset_index()
         .merge(
             geo_df[[REGION_NAME_COL, LONG_COL, LAT_COL]],
@@ -520,18 +587,22 @@ def __make_daybyday_interactive_timeline(
     df[COLOR_COL] = np.where(df[value_col] > 0, df[value_col], "NaN")
 
     # Technically takes a df but we don't need the index
+    # The numeric (i.e., per-date value) columns, which make up the bulk of the data,
+    # are passed as arrays, which bokeh embeds as base64-encoded binary instead of as
+    # JSON text; everything else (including the "NaN"-containing long/lat lists) has to
+    # stay a list
+    is_total_count = df[Columns.COUNT_TYPE] == Counting.TOTAL_CASES.name
     bokeh_data_source = ColumnDataSource(
-        {k: v.tolist() for k, v in df.to_dict(orient="series").items()}
+        {
+            k: (
+                _to_value_array(v, is_total_count)
+                if pd.api.types.is_numeric_dtype(v)
+                else v.tolist()
+            )
+            for k, v in df.items()
+        }
     )
 
-    filters = [
-        [
-            GroupFilter(column_name=Columns.STAGE, group=stage.name),
-            GroupFilter(column_name=Columns.COUNT_TYPE, group=count.name),
-        ]
-        for stage, count in stage_count_list
-    ]
-
     figures = []
 
     for subplot_index, (stage, count) in enumerate(stage_count_list):
@@ -551,7 +622,13 @@ def __make_daybyday_interactive_timeline(
         #         transform=ax.transAxes,
         #     )
 
-        view = CDSView(source=bokeh_data_source, filters=filters[subplot_index])
+        view = CDSView(
+            source=bokeh_data_source,
+            filters=[
+                GroupFilter(column_name=Columns.STAGE, group=stage.name),
+                GroupFilter(column_name=Columns.COUNT_TYPE, group=count.name),
+            ],
+        )
 
         vmin = vmins[(stage.name, count.name)]
         vmax = vmaxs[(stage.name, count.name)]
@@ -649,21 +726,13 @@ def __make_daybyday_interactive_timeline(
             * (tick_dist ** np.arange(0, n_cbar_major_ticks))
             # * (bucket_size ** 0.5) # Use this if centering ticks on buckets
         )
-        # Get minor locs by linearly interpolating between major ticks
-        minor_tick_locs = []
-        for major_tick_index, this_major_tick in enumerate(major_tick_locs[:-1]):
-            next_major_tick = major_tick_locs[major_tick_index + 1]
-
-            # Get minor ticks as numbers in range [this_major_tick, next_major_tick]
-            # and exclude the major ticks themselves (once we've used them to
-            # compute the minor tick locs)
-            minor_tick_locs.extend(
-                np.linspace(
-                    this_major_tick,
-                    next_major_tick,
-                    n_minor_ticks_btwn_major_ticks + 2,
-                )[1:-1]
-            )
+        # Get minor locs by linearly interpolating between each pair of consecutive
+        # major ticks, excluding the major ticks themselves
+        minor_tick_fracs = np.linspace(0, 1, n_minor_ticks_btwn_major_ticks + 2)[1:-1]
+        minor_tick_locs = (
+            major_tick_locs[:-1, np.newaxis] * (1 - minor_tick_fracs)
+            + major_tick_locs[1:, np.newaxis] * minor_tick_fracs
+        ).ravel()
 
         color_bar = ColorBar(
             color_mapper=color_mapper,
@@ -1051,8 +1120,10 @@ def __make_daybyday_interactive_timeline(
         gp.sizing_mode = "fixed"
         orig_title = anchor_fig.title.text
 
-        for date in dates:
-            date_str = date.strftime(DATE_FMT)
+        date_strs = dates.strftime(DATE_FMT)
+        last_date_str = max(date_strs)  # DATE_FMT sorts chronologically
+
+        for date_str in date_strs:
             anchor_fig.title = Title(text=f"{orig_title} {date_str}")
 
             for p in figures:
@@ -1074,7 +1145,7 @@ def __make_daybyday_interactive_timeline(
             export_png(gp, filename=save_path)
             resize_to_even_dims(save_path, pad_bottom=0.08)
 
-            if date == max(dates):
+            if date_str == last_date_str:
                 poster_path: Path = (
                     PNG_SAVE_ROOT_DIR / (out_file_basename + "_poster")
                 ).with_suffix(".png")
@@ -1135,10 +1206,10 @@ def _make_daybyday_diff_interactive_timeline(
     DIFF_COL = "Diff_"
 
     def get_case_diffs(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        df[DIFF_COL] = df.groupby([REGION_NAME_COL, Columns.STAGE, Columns.COUNT_TYPE])[
-            Columns.CASE_COUNT
-        ].diff()
+        # No need to copy df; it's the plotting function's own intermediate frame
+        df[DIFF_COL] = df.groupby(
+            [REGION_NAME_COL, Columns.STAGE, Columns.COUNT_TYPE], sort=False
+        )[Columns.CASE_COUNT].diff()
 
         df = df[df[DIFF_COL].notna()]
         return df
@@ -1171,14 +1242,16 @@ def __assign_region_name_col(df: pd.DataFrame, region_name_col: str) -> pd.DataF
     :return: `df` with the column renamed
     :rtype: pd.DataFrame
     """
-    return df.rename(columns={region_name_col: REGION_NAME_COL})
+    # Only the labels change, so there's no need to copy the data; nothing downstream
+    # modifies the returned frame in place
+    return df.rename(columns={region_name_col: REGION_NAME_COL}, copy=False)
 
 
 def _prepare_usa_states_df(df: pd.DataFrame) -> pd.DataFrame:
     df = df[
         (df[Columns.TWO_LETTER_STATE_CODE].isin(USA_STATE_CODES))
         & (~df[Columns.TWO_LETTER_STATE_CODE].isin(["AK", "HI"]))
-    ].copy()
+    ]
 
     df = __assign_region_name_col(df, Columns.TWO_LETTER_STATE_CODE)
 
@@ -1311,6 +1384,108 @@ def make_countries_daybyday_diff_interactive_timeline(
     )
 
 
+def make_usa_daybyday_interactive_timelines(
+    states_df: pd.DataFrame,
+    *,
+    usa_states_geo_df: geopandas.GeoDataFrame = None,
+    stage: Union[DiseaseStage, Literal[Select.ALL]] = Select.ALL,
+    count: Union[Counting, Literal[Select.ALL]] = Select.ALL,
+    should_make_video: bool,
+) -> Tuple[InfoForAutoload, InfoForAutoload]:
+    """Make both the total and the diff interactive timelines for US states
+
+    The input is prepared once and the same prepared frame (and geo frame) is used for
+    both timelines, rather than each preparing its own as the single-timeline make_*
+    functions do
+
+    :param states_df: The COVID data DataFrame
+    :type states_df: pd.DataFrame
+    :param usa_states_geo_df: The geometry GeoDataFrame for the locations in
+    `states_df`, defaults to None, in which case `get_usa_states_geo_df()` is used
+    :type usa_states_geo_df: geopandas.GeoDataFrame, optional
+    :param stage: The DiseaseStage to plot, defaults to Select.ALL. If ALL, then all
+    stages are plotted and are stacked vertically.
+    :type stage: Union[DiseaseStage, Literal[Select.ALL]], optional
+    :param count: The Counting to plot, defaults to Select.ALL. If ALL, then all
+    count types are plotted and are stacked horizontally.
+    :type count: Union[Counting, Literal[Select.ALL]], optional
+    :param should_make_video: Whether to also make a video of each timeline
+    :type should_make_video: bool
+    :return: The (total, diff) timelines' info for autoloading their plots
+    :rtype: Tuple[InfoForAutoload, InfoForAutoload]
+    """
+
+    # Prepare the inputs once and share them between the total and diff timelines
+    states_df = _prepare_usa_states_df(states_df)
+
+    if usa_states_geo_df is None:
+        usa_states_geo_df = get_usa_states_geo_df()
+
+    kwargs = {
+        "geo_df": usa_states_geo_df,
+        "stage": stage,
+        "count": count,
+        "should_make_video": should_make_video,
+        **_get_usa_kwargs(),
+    }
+
+    return (
+        _make_daybyday_total_interactive_timeline(states_df, **kwargs),
+        _make_daybyday_diff_interactive_timeline(states_df, **kwargs),
+    )
+
+
+def make_countries_daybyday_interactive_timelines(
+    countries_df: pd.DataFrame,
+    *,
+    countries_geo_df: geopandas.GeoDataFrame = None,
+    stage: Union[DiseaseStage, Literal[Select.ALL]] = Select.ALL,
+    count: Union[Counting, Literal[Select.ALL]] = Select.ALL,
+    should_make_video: bool,
+) -> Tuple[InfoForAutoload, InfoForAutoload]:
+    """Make both the total and the diff interactive timelines for countries
+
+    The input is prepared once and the same prepared frame (and geo frame) is used for
+    both timelines, rather than each preparing its own as the single-timeline make_*
+    functions do
+
+    :param countries_df: The COVID data DataFrame
+    :type countries_df: pd.DataFrame
+    :param countries_geo_df: The geometry GeoDataFrame for the locations in
+    `countries_df`, defaults to None, in which case `get_countries_geo_df()` is used
+    :type countries_geo_df: geopandas.GeoDataFrame, optional
+    :param stage: The DiseaseStage to plot, defaults to Select.ALL. If ALL, then all
+    stages are plotted and are stacked vertically.
+    :type stage: Union[DiseaseStage, Literal[Select.ALL]], optional
+    :param count: The Counting to plot, defaults to Select.ALL. If ALL, then all
+    count types are plotted and are stacked horizontally.
+    :type count: Union[Counting, Literal[Select.ALL]], optional
+    :param should_make_video: Whether to also make a video of each timeline
+    :type should_make_video: bool
+    :return: The (total, diff) timelines' info for autoloading their plots
+    :rtype: Tuple[InfoForAutoload, InfoForAutoload]
+    """
+
+    # Prepare the inputs once and share them between the total and diff timelines
+    countries_df = _prepare_countries_df(countries_df)
+
+    if countries_geo_df is None:
+        countries_geo_df = get_countries_geo_df()
+
+    kwargs = {
+        "geo_df": countries_geo_df,
+        "stage": stage,
+        "count": count,
+        "should_make_video": should_make_video,
+        **_get_countries_kwargs(),
+    }
+
+    return (
+        _make_daybyday_total_interactive_timeline(countries_df, **kwargs),
+        _make_daybyday_diff_interactive_timeline(countries_df, **kwargs),
+    )
+
+
 def make_video(img_dir: Path, out_file_name: str, fps: float):
     """Given a folder containing PNGs, stitch the PNGs into a video
 
@@ -126,7 +126,7 @@ def get_current_case_data(
             # .tail(1).sum() is a trick to get the last value if it exists,
             # else 0 (remember, this is sorted by date)
             **(
-                g.groupby(Columns.CASE_TYPE)[Columns.CASE_COUNT]
+                g.groupby(Columns.CASE_TYPE, observed=True)[Columns.CASE_COUNT]
                 .apply(lambda h: h.tail(1).sum())
                 .to_dict()
             ),
@@ -1,11 +1,15 @@
 # %%
+import concurrent.futures
 import enum
+import functools
 import io
 from pathlib import Path
 
 import pandas as pd
 import requests
 from IPython.display import display  # noqa F401
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from constants import (
     USA_STATE_CODES,
@@ -38,6 +42,50 @@ DATA_COLS = [
 ]
 
 
+@functools.lru_cache(None)
+def _read_lookup_table(filename: str) -> pd.DataFrame:
+    """Read one of the static lookup tables (populations, state abbreviations, etc.)
+
+    These never change, so each is only read once; since the result is shared between
+    callers, don't modify it
+
+    :param filename: The name of the table's file, in `Paths.DATA`
+    :type filename: str
+    :return: The table, with all columns as strings
+    :rtype: pd.DataFrame
+    """
+
+    return pd.read_csv(Paths.DATA / filename, dtype="string")
+
+
+@functools.lru_cache(None)
+def _get_session() -> requests.Session:
+    """Get the (shared) session used to fetch data from the web
+
+    Using one session lets consecutive requests to the same host reuse a connection,
+    and its adapter retries transient failures with exponential backoff
+
+    :return: The session
+    :rtype: requests.Session
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        max_retries=Retry(
+            total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504]
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _fetch_text(url: str, **kwargs) -> str:
+    r = _get_session().get(url, timeout=60, **kwargs)
+    r.raise_for_status()
+    return r.text
+
+
 class SaveFormats(enum.Enum):
     CSV: "SaveFormats" = ".csv"
 
@@ -88,7 +136,9 @@ class SaveFormats(enum.Enum):
 
         if from_web:
             df = pd.read_csv(
-                Urls.COVIDTRACKING_STATES_DAILY_HISTORICAL, dtype=str, low_memory=False,
+                io.StringIO(_fetch_text(Urls.COVIDTRACKING_STATES_DAILY_HISTORICAL)),
+                dtype=str,
+                low_memory=False,
             )
             self._print_if_new_data(df, local_data_path, "Got new US states data")
 
@@ -133,7 +183,7 @@ class SaveFormats(enum.Enum):
         df[Columns.CASE_COUNT] = df[Columns.CASE_COUNT].fillna(0).astype(int)
 
         df[Columns.STATE] = df.merge(
-            pd.read_csv(Paths.DATA / "usa_state_abbreviations.csv", dtype="string"),
+            _read_lookup_table("usa_state_abbreviations.csv"),
             how="left",
             left_on=Columns.TWO_LETTER_STATE_CODE,
             right_on="Abbreviation:",
@@ -146,7 +196,7 @@ class SaveFormats(enum.Enum):
         df[Columns.COUNTRY] = Locations.USA
 
         population_series = df.merge(
-            pd.read_csv(Paths.DATA / "usa_and_state_populations.csv", dtype="string"),
+            _read_lookup_table("usa_and_state_populations.csv"),
             how="left",
             left_on=Columns.TWO_LETTER_STATE_CODE,
             right_on="Abbreviation:",
@@ -164,8 +214,10 @@ class SaveFormats(enum.Enum):
         local_data_path = Paths.DATA / "covid_countries_daily"
         if from_web:
             # WaPo delays requests if they don't have a human-like user agent
-            r = requests.get(Urls.WAPO_COUNTRIES_DAILY_HISTORICAL, headers=Urls.HEADERS)
-            df = pd.read_csv(io.StringIO(r.text), dtype=str, low_memory=False)
+            csv_text = _fetch_text(
+                Urls.WAPO_COUNTRIES_DAILY_HISTORICAL, headers=Urls.HEADERS
+            )
+            df = pd.read_csv(io.StringIO(csv_text), dtype=str, low_memory=False)
             self._print_if_new_data(df, local_data_path, "Got new countries data")
             self.save(df, local_data_path)
         else:
@@ -194,14 +246,12 @@ class SaveFormats(enum.Enum):
         df[Columns.CASE_COUNT] = df[Columns.CASE_COUNT].fillna(0).astype(int)
 
         df[Columns.STATE] = ""  # NA preferred except it doesn't play nice with groupby
-        df[Columns.COUNTRY] = (
-            df[Columns.COUNTRY]
-            .map({"U.S.": Locations.USA, "Georgia": "Georgia (country)"})
-            .fillna(df[Columns.COUNTRY])
+        df[Columns.COUNTRY] = df[Columns.COUNTRY].replace(
+            {"U.S.": Locations.USA, "Georgia": "Georgia (country)"}
         )
 
         population_series = df.merge(
-            pd.read_csv(Paths.DATA / "country_populations.csv", dtype="string"),
+            _read_lookup_table("country_populations.csv"),
             how="left",
             left_on=Columns.COUNTRY,
             right_on="Country (or dependent territory)",
@@ -238,15 +288,11 @@ class SaveFormats(enum.Enum):
             }
         )
 
-        per_capita_df[Columns.CASE_TYPE] = (
-            per_capita_df[Columns.CASE_TYPE]
-            .map(
-                {
-                    CaseTypes.CONFIRMED: CaseTypes.CONFIRMED_PER_CAPITA,
-                    CaseTypes.DEATHS: CaseTypes.DEATHS_PER_CAPITA,
-                }
-            )
-            .fillna(per_capita_df[Columns.CASE_TYPE])
+        per_capita_df[Columns.CASE_TYPE] = per_capita_df[Columns.CASE_TYPE].replace(
+            {
+                CaseTypes.CONFIRMED: CaseTypes.CONFIRMED_PER_CAPITA,
+                CaseTypes.DEATHS: CaseTypes.DEATHS_PER_CAPITA,
+            }
         )
 
         per_capita_df[Columns.CASE_COUNT] /= per_capita_df[Columns.POPULATION]
@@ -327,8 +373,15 @@ class SaveFormats(enum.Enum):
         else:
             print("Using locally cached data")
 
-        states_df = self._read_states_daily(from_web=from_web)
-        countries_df = self._read_countries_daily(from_web=from_web)
+        # The two sources are independent, and reading them (especially from the web)
+        # is mostly waiting on I/O, so read them concurrently
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            states_future = executor.submit(self._read_states_daily, from_web=from_web)
+            countries_future = executor.submit(
+                self._read_countries_daily, from_web=from_web
+            )
+            states_df = states_future.result()
+            countries_df = countries_future.result()
 
         # We don't really need to groupby state; just don't want to drop the column
         world_df = countries_df.groupby([Columns.DATE, Columns.CASE_TYPE])[
@@ -342,9 +395,7 @@ class SaveFormats(enum.Enum):
 
         world_minus_china_df = world_df - china_df
 
-        countries_pop_df = pd.read_csv(
-            Paths.DATA / "country_populations.csv", dtype=str
-        )
+        countries_pop_df = _read_lookup_table("country_populations.csv")
         world_pop = int(
             countries_pop_df.loc[
                 countries_pop_df["Country (or dependent territory)"] == "World",